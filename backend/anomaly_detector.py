@@ -1,9 +1,94 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple
-from scipy import stats
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Tuple
 from datetime import datetime, timedelta
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; the NumPy kernel is used instead
+    njit = None
+
+# Metrics per worker thread in detect_all_anomalies; fewer metrics run inline
+METRICS_PER_WORKER = 8
+MAX_WORKERS = 8
+
+# Severity codes produced by the anomaly kernel: 0 = info, 1 = warning, 2 = critical
+SEVERITY_LABELS = np.array(['info', 'warning', 'critical'])
+# Z-score cut-offs between those codes; a Z-score must exceed a cut-off to move up
+SEVERITY_BINS = np.array([2.5, 3.0])
+
+# Fields of the columnar anomaly store (AnomalyDetector.anoms), one array per field
+ANOMALY_FIELDS = ('metric', 'row', 'date', 'value', 'z_score', 'severity', 'pct_change', 'baseline_mean')
+
+
+@dataclass(slots=True)
+class Anomaly:
+    """
+    One detected anomaly
+    Slotted to keep per-record memory and attribute access cheap; converted
+    to a plain dict (dataclasses.asdict) only where summaries are returned
+    """
+    date: Any
+    metric: str
+    value: float
+    z_score: float
+    severity: str
+    pct_change: float
+    baseline_mean: float = None
+    text: str = None
+    group: Any = None
+    group_col: str = None
+
+
+def _anomaly_kernel_numpy(deviations: np.ndarray, means: np.ndarray, stds: np.ndarray, threshold: float):
+    """
+    Fused anomaly kernel over a (rows x metrics) matrix of deviations from
+    the column means (centred in float64 before any narrowing, so large
+    offsets don't swamp the variation)
+    Returns (mask, z_scores, pct_changes, severity_codes), all shaped like deviations
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z_scores = np.abs(deviations / stds)
+        pct_changes = np.where(means != 0, deviations / means * 100, 0.0)
+    severity_codes = (z_scores > 2.5).astype(np.int8) + (z_scores > 3.0)
+    return z_scores > threshold, z_scores, pct_changes, severity_codes
+
+
+def _anomaly_kernel_loops(deviations, means, stds, threshold):
+    """Same as _anomaly_kernel_numpy, written as explicit loops for Numba"""
+    n_rows, n_cols = deviations.shape
+    mask = np.zeros((n_rows, n_cols), dtype=np.bool_)
+    z_scores = np.empty_like(deviations)
+    pct_changes = np.zeros_like(deviations)
+    severity_codes = np.zeros((n_rows, n_cols), dtype=np.int8)
+    
+    for i in range(n_rows):
+        for j in range(n_cols):
+            deviation = deviations[i, j]
+            z = abs(deviation / stds[j])
+            z_scores[i, j] = z
+            mask[i, j] = z > threshold
+            if means[j] != 0:
+                pct_changes[i, j] = deviation / means[j] * 100
+            if z > 3.0:
+                severity_codes[i, j] = 2
+            elif z > 2.5:
+                severity_codes[i, j] = 1
+    
+    return mask, z_scores, pct_changes, severity_codes
+
+
+# nogil lets the detect_all_anomalies thread pool run metric blocks in parallel.
+# fastmath is left off because NaN z-scores must never compare as anomalies.
+if njit is not None:
+    _anomaly_kernel = njit(nogil=True, cache=True, error_model='numpy')(_anomaly_kernel_loops)
+else:
+    _anomaly_kernel = _anomaly_kernel_numpy
+
+
 class AnomalyDetector:
     """
     Step 4: Detect anomalies in KPIs using statistical methods
@@ -18,38 +103,64 @@ class AnomalyDetector:
         z_score_threshold: Default 2.0 = 95% confidence (values beyond this are anomalous)
         lookback_days: Number of days to use for baseline calculation
         """
-        self.df = combined_df.copy()
+        # The frame is only read, never modified, so it is shared rather than copied
+        self.df = combined_df
         self.z_score_threshold = z_score_threshold
         self.lookback_days = lookback_days
-        self.anomalies = []
         self.anomaly_details = {}
+        self._metric_stats: Dict[str, Tuple[float, float]] = {}
+        self._anomaly_records = None
+        self._date_order = None
+        self._numeric_cols = list(self.df.select_dtypes(include=[np.number]).columns)
         
-        # Ensure date is datetime
+        # Ensure date is datetime, without writing back into the shared frame
+        self._dates = None
         if 'date' in self.df.columns:
-            self.df['date'] = pd.to_datetime(self.df['date'])
+            self._dates = pd.DatetimeIndex(pd.to_datetime(self.df['date']))
+        
+        # Detected anomalies, stored column-wise (see ANOMALY_FIELDS)
+        self.anoms = self._detect_across_metrics([])
     
-    def calculate_z_scores(self, metric: str) -> pd.Series:
+    def _stats(self, metric: str) -> Tuple[float, float]:
         """
-        Calculate Z-scores for a metric
+        Get (mean, std) of a metric, ignoring NaN values
+        Two-pass float64 nanmean/nanstd(ddof=1): a sum-of-squares shortcut
+        cancels to 0 when the values sit on a large offset (e.g. 1e9 + noise)
+        std is NaN with fewer than 2 values
+        Cached per metric so repeated detect_* calls don't rescan the column;
+        every metric's stats go through here, so the cache holds one estimator
+        """
+        cached = self._metric_stats.get(metric)
+        if cached is None:
+            values = self.df[metric].to_numpy(dtype=np.float64, na_value=np.nan)
+            with warnings.catch_warnings():
+                # Empty or single-value columns get NaN stats and never flag anomalies
+                warnings.simplefilter('ignore', RuntimeWarning)
+                cached = (np.nanmean(values), np.nanstd(values, ddof=1))
+            self._metric_stats[metric] = cached
+        return cached
+    
+    def calculate_z_scores(self, metric: str) -> np.ndarray:
+        """
+        Calculate absolute Z-scores for a metric, aligned with self.df rows
         Z-score = (value - mean) / std_dev
+        Computed in float32 (mean and std are still accumulated in float64)
+        Returns all zeros when the metric is missing, has fewer than 2 values
+        or has no variation
         """
         if metric not in self.df.columns:
-            return pd.Series()
+            return np.zeros(len(self.df), dtype=np.float32)
         
-        data = self.df[metric].dropna()
-        if len(data) < 2:
-            return pd.Series()
+        values = self.df[metric].to_numpy(dtype=np.float64, na_value=np.nan)
+        mean, std = self._stats(metric)
         
-        mean = data.mean()
-        std = data.std()
+        if not std > 0:  # All values are the same (or too few to tell)
+            return np.zeros(len(values), dtype=np.float32)
         
-        if std == 0:  # All values are the same
-            return pd.Series(0, index=self.df.index)
-        
-        z_scores = np.abs((self.df[metric] - mean) / std)
-        return z_scores
+        # Centre in float64 before narrowing so large offsets keep their precision
+        return np.abs((values - mean).astype(np.float32) / np.float32(std))
     
-    def detect_anomalies_by_metric(self, metric: str, by_group: str = None) -> List[Dict]:
+    def detect_anomalies_by_metric(self, metric: str, by_group: str = None) -> List[Anomaly]:
         """
         Detect anomalies for a specific metric
         metric: column name (e.g., 'ctr', 'conversions', 'revenue')
@@ -61,167 +172,302 @@ class AnomalyDetector:
             return anomalies
         
         if by_group and by_group in self.df.columns:
-            # Detect anomalies within each group
-            for group_value in self.df[by_group].unique():
-                group_data = self.df[self.df[by_group] == group_value]
-                group_anomalies = self._detect_within_group(
-                    group_data, metric, group_value, by_group
-                )
-                anomalies.extend(group_anomalies)
+            # Detect anomalies within each group using per-row group stats
+            # from a single groupby pass
+            anomalies = self._detect_within_groups(metric, by_group)
         else:
             # Detect anomalies across all data
-            z_scores = self.calculate_z_scores(metric)
-            
-            for idx, z_score in z_scores.items():
-                if z_score > self.z_score_threshold:
-                    value = self.df.loc[idx, metric]
-                    date = self.df.loc[idx, 'date'] if 'date' in self.df.columns else None
-                    
-                    # Calculate severity
-                    severity = self._calculate_severity(z_score)
-                    
-                    # Calculate percentage change from mean
-                    mean = self.df[metric].mean()
-                    pct_change = ((value - mean) / mean * 100) if mean != 0 else 0
-                    
-                    anomaly = {
-                        'date': date,
-                        'metric': metric,
-                        'value': value,
-                        'z_score': z_score,
-                        'severity': severity,
-                        'pct_change': pct_change,
-                        'baseline_mean': mean,
-                        'text': f"{severity.upper()}: {metric} = {value:.2f} (Z-score: {z_score:.2f}, {pct_change:+.1f}% from baseline)"
-                    }
-                    anomalies.append(anomaly)
+            anomalies = self._to_records(self._detect_across_metrics([metric]))
         
         return anomalies
     
-    def _detect_within_group(self, group_data: pd.DataFrame, metric: str, 
-                            group_value: str, group_col: str) -> List[Dict]:
-        """Helper to detect anomalies within a group"""
-        anomalies = []
+    def _detect_across_metrics(self, metrics: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Detect anomalies for several metrics in a single pass
+        Z-scores for all metrics are computed together as one (rows x metrics) matrix
+        The matrix is float32 to halve memory traffic; means and stds are
+        accumulated in float64 and reported anomaly values are the original data
+        Returns the anomalies column-wise, one array per field in ANOMALY_FIELDS
+        """
+        metrics = [m for m in dict.fromkeys(metrics) if m in self.df.columns]
+        
+        # Stats come from _stats, the same estimator and cache as the other
+        # detect_* paths; deviations are taken in float64, one column at a
+        # time, and only then narrowed to float32
+        means = np.empty(len(metrics))
+        stds = np.empty(len(metrics))
+        D = np.empty((len(self.df), len(metrics)), dtype=np.float32)
+        for j, metric in enumerate(metrics):
+            means[j], stds[j] = self._stats(metric)
+            D[:, j] = self.df[metric].to_numpy(dtype=np.float64, na_value=np.nan) - means[j]
+        
+        if metrics:
+            stds = np.where(stds == 0, np.nan, stds)
+            mask, Z, P, S = _anomaly_kernel(D, means.astype(np.float32), stds.astype(np.float32),
+                                             float(self.z_score_threshold))
+        else:
+            mask = Z = P = np.empty((len(D), 0), dtype=np.float32)
+            S = np.empty((len(D), 0), dtype=np.int8)
+        
+        # Scan the transposed mask so anomalies come out grouped by metric
+        cols, rows = np.nonzero(mask.T)
+        
+        # Anomalies are grouped by metric, so each column's values are gathered at full precision
+        values = np.empty(len(rows))
+        starts = np.searchsorted(cols, np.arange(len(metrics) + 1))
+        for j, metric in enumerate(metrics):
+            lo, hi = starts[j], starts[j + 1]
+            if hi > lo:
+                values[lo:hi] = self.df[metric].iloc[rows[lo:hi]].to_numpy(dtype=np.float64)
+        
+        return {
+            'metric': np.array(metrics, dtype=object)[cols],
+            'row': rows,
+            'date': self._dates.to_numpy()[rows] if self._dates is not None else np.full(len(rows), None),
+            'value': values,
+            'z_score': Z[rows, cols].astype(np.float64),
+            'severity': SEVERITY_LABELS[S[rows, cols]],
+            'pct_change': P[rows, cols].astype(np.float64),
+            'baseline_mean': means[cols],
+        }
+    
+    def _to_records(self, anoms: Dict[str, np.ndarray], idx: np.ndarray = None) -> List[Anomaly]:
+        """
+        Materialize column-wise anomalies as a list of Anomaly records
+        idx: optional positions to materialize (default: all, in stored order)
+        """
+        if idx is None:
+            idx = np.arange(len(anoms['z_score']))
+        
+        dates = anoms['date'][idx]
+        dates = pd.DatetimeIndex(dates).tolist() if dates.dtype.kind == 'M' else dates.tolist()
+        
+        return [
+            Anomaly(*fields)
+            for fields in zip(
+                dates, anoms['metric'][idx], anoms['value'][idx], anoms['z_score'][idx],
+                anoms['severity'][idx].tolist(), anoms['pct_change'][idx], anoms['baseline_mean'][idx])
+        ]
+    
+    def _grouped_zscores(self, metric: str, group_col: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Calculate Z-scores of a metric against each row's own group baseline
+        Row positions per group come from one groupby().indices hash build and
+        every group is reduced with np.add.reduceat
+        Returns (z_scores, group_means, group_sizes), all aligned with self.df rows
+        """
+        values = self.df[metric].to_numpy(dtype=np.float64)
+        
+        z_scores = np.full(len(values), np.nan)
+        group_means = np.full(len(values), np.nan)
+        group_sizes = np.zeros(len(values), dtype=np.int64)
+        
+        # Rows with a missing group key do not belong to any group
+        groups = self.df.groupby(group_col, sort=False, observed=True).indices
+        if not groups:
+            return z_scores, group_means, group_sizes
+        sizes = np.fromiter((len(idx) for idx in groups.values()), dtype=np.int64, count=len(groups))
+        order = np.concatenate(list(groups.values()))
+        edges = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        vals = values[order]
+        
+        # NaN values are skipped in the stats, like pandas mean()/std()
+        valid = ~np.isnan(vals)
+        counts = np.add.reduceat(valid.astype(np.int64), edges)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = np.add.reduceat(np.where(valid, vals, 0.0), edges) / counts
+            row_means = np.repeat(means, sizes)
+            deviations = vals - row_means
+            sq_devs = np.where(valid, deviations * deviations, 0.0)
+            stds = np.sqrt(np.add.reduceat(sq_devs, edges) / (counts - 1))
+            stds[stds == 0] = np.nan
+            
+            # Scatter back through the sort order to restore row alignment
+            z_scores[order] = np.abs(deviations / np.repeat(stds, sizes))
+        group_means[order] = row_means
+        group_sizes[order] = np.repeat(sizes, sizes)
         
-        if len(group_data) < 3:
-            return anomalies
+        return z_scores, group_means, group_sizes
+    
+    def _detect_within_groups(self, metric: str, group_col: str) -> List[Anomaly]:
+        """Helper to detect anomalies within every group of group_col"""
+        z, group_means, group_sizes = self._grouped_zscores(metric, group_col)
         
-        z_scores = np.abs((group_data[metric] - group_data[metric].mean()) / group_data[metric].std())
-        
-        for idx, z_score in z_scores.items():
-            if z_score > self.z_score_threshold:
-                value = group_data.loc[idx, metric]
-                date = group_data.loc[idx, 'date'] if 'date' in group_data.columns else None
-                severity = self._calculate_severity(z_score)
-                
-                mean = group_data[metric].mean()
-                pct_change = ((value - mean) / mean * 100) if mean != 0 else 0
-                
-                anomaly = {
-                    'date': date,
-                    'metric': metric,
-                    'value': value,
-                    'z_score': z_score,
-                    'severity': severity,
-                    'pct_change': pct_change,
-                    'baseline_mean': mean,
-                    'group': group_value,
-                    'group_col': group_col,
-                    'text': f"{severity.upper()}: {metric} for {group_col}={group_value} = {value:.2f} (Z-score: {z_score:.2f}, {pct_change:+.1f}%)"
-                }
-                anomalies.append(anomaly)
+        # Groups with fewer than 3 rows are too small for a meaningful baseline
+        mask = (z > self.z_score_threshold) & (group_sizes >= 3)
+        if not mask.any():
+            return []
         
-        return anomalies
+        values = self.df[metric].to_numpy()[mask]
+        means = group_means[mask]
+        z = z[mask]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct_changes = np.where(means != 0, (values - means) / means * 100, 0.0)
+        severities = self._calculate_severity(z)
+        group_values = self.df.loc[mask, group_col].tolist()
+        dates = self._dates[mask].tolist() if self._dates is not None else [None] * len(values)
+        
+        return [
+            Anomaly(date, metric, value, z_score, severity, pct_change, mean,
+                    group=group_value, group_col=group_col)
+            for date, value, z_score, severity, pct_change, mean, group_value
+            in zip(dates, values, z, severities, pct_changes, means, group_values)
+        ]
+    
+    def _format_anomaly_text(self, anomaly: Anomaly) -> str:
+        """
+        Build the one-line description of an anomaly
+        Formatted on demand instead of for every detected anomaly
+        """
+        severity = anomaly.severity.upper()
+        metric = anomaly.metric
+        value = anomaly.value
+        z_score = anomaly.z_score
+        pct_change = anomaly.pct_change
+        
+        if anomaly.group_col is not None:
+            return f"{severity}: {metric} for {anomaly.group_col}={anomaly.group} = {value:.2f} (Z-score: {z_score:.2f}, {pct_change:+.1f}%)"
+        return f"{severity}: {metric} = {value:.2f} (Z-score: {z_score:.2f}, {pct_change:+.1f}% from baseline)"
+    
+    def _anomaly_dict(self, anomaly: Anomaly) -> Dict:
+        """Plain dict of an anomaly for summaries, with its text filled in"""
+        record = asdict(anomaly)
+        if record['text'] is None:
+            record['text'] = self._format_anomaly_text(anomaly)
+        return record
     
-    def _calculate_severity(self, z_score: float) -> str:
+    def _calculate_severity(self, z_scores: np.ndarray) -> List[str]:
         """
-        Calculate severity level based on Z-score
+        Calculate severity levels for an array of Z-scores
         Z > 3.0: Critical (99.7% confidence)
         Z > 2.5: Warning (98.8% confidence)
         Z > 2.0: Info (95.4% confidence)
         """
-        if z_score > 3.0:
-            return 'critical'
-        elif z_score > 2.5:
-            return 'warning'
-        else:
-            return 'info'
+        # right=True puts values equal to a cut-off in the lower bin, matching '>'
+        return SEVERITY_LABELS[np.digitize(z_scores, SEVERITY_BINS, right=True)].tolist()
+    
+    def _sorted_dates(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get (row_order, sorted_dates) for the non-missing dates
+        Sorted once on first use so date-window lookups can binary search
+        """
+        if self._date_order is None:
+            date_values = self._dates.to_numpy()
+            order = np.argsort(date_values, kind='stable')
+            n_valid = len(order) - np.isnat(date_values).sum()  # NaT sorts last
+            order = order[:n_valid]
+            self._date_order = (order, date_values[order])
+        return self._date_order
     
-    def detect_recent_anomalies(self, metric: str, days: int = 1) -> List[Dict]:
+    def detect_recent_anomalies(self, metric: str, days: int = 1) -> List[Anomaly]:
         """
         Detect anomalies in the most recent N days only
         Useful for "what's wrong today" analysis
         """
-        if 'date' not in self.df.columns or metric not in self.df.columns:
+        if self._dates is None or metric not in self.df.columns:
             return []
         
-        recent_date = self.df['date'].max() - timedelta(days=days)
-        recent_data = self.df[self.df['date'] >= recent_date]
+        order, sorted_dates = self._sorted_dates()
+        mean, std = self._stats(metric)
+        if len(sorted_dates) == 0 or not std > 0:
+            return []
         
-        anomalies = []
-        z_scores = self.calculate_z_scores(metric)
-        
-        for idx in recent_data.index:
-            if idx in z_scores.index:
-                z_score = z_scores[idx]
-                if z_score > self.z_score_threshold:
-                    value = self.df.loc[idx, metric]
-                    date = self.df.loc[idx, 'date']
-                    severity = self._calculate_severity(z_score)
-                    mean = self.df[metric].mean()
-                    pct_change = ((value - mean) / mean * 100) if mean != 0 else 0
-                    
-                    anomaly = {
-                        'date': date,
-                        'metric': metric,
-                        'value': value,
-                        'z_score': z_score,
-                        'severity': severity,
-                        'pct_change': pct_change,
-                        'text': f"[{date.strftime('%Y-%m-%d')}] {metric}: {pct_change:+.1f}%"
-                    }
-                    anomalies.append(anomaly)
+        # Binary search the window start, then score only the rows inside it
+        recent_date = sorted_dates[-1] - np.timedelta64(timedelta(days=days))
+        start = np.searchsorted(sorted_dates, recent_date, side='left')
+        rows = np.sort(order[start:])  # back to frame order
+        values = self.df[metric].to_numpy()[rows]
+        z = np.abs((values - mean) / std)
         
-        return anomalies
+        hits = z > self.z_score_threshold
+        if not hits.any():
+            return []
+        
+        rows = rows[hits]
+        values = values[hits]
+        z = z[hits]
+        pct_changes = (values - mean) / mean * 100 if mean != 0 else np.zeros(len(values))
+        severities = self._calculate_severity(z)
+        dates = self._dates[rows].tolist()
+        
+        return [
+            Anomaly(date, metric, value, z_score, severity, pct_change, mean,
+                    text=f"[{date.strftime('%Y-%m-%d')}] {metric}: {pct_change:+.1f}%")
+            for date, value, z_score, severity, pct_change in zip(dates, values, z, severities, pct_changes)
+        ]
     
-    def detect_all_anomalies(self, metrics_to_check: List[str] = None) -> Dict[str, List[Dict]]:
+    def detect_all_anomalies(self, metrics_to_check: List[str] = None) -> Dict[str, List[Anomaly]]:
         """
         Detect anomalies across multiple metrics
         metrics_to_check: list of column names to analyze
                          if None, will auto-detect numeric columns
         """
         if metrics_to_check is None:
-            # Auto-detect numeric columns (excluding date)
-            metrics_to_check = [col for col in self.df.select_dtypes(include=[np.number]).columns]
+            # Auto-detect numeric columns (excluding date), cached at construction
+            metrics_to_check = self._numeric_cols
         
-        all_anomalies = {}
+        metrics = list(dict.fromkeys(metrics_to_check))
+        blocks = [metrics[i:i + METRICS_PER_WORKER] for i in range(0, len(metrics), METRICS_PER_WORKER)]
         
-        for metric in metrics_to_check:
-            anomalies = self.detect_anomalies_by_metric(metric)
-            if anomalies:
-                all_anomalies[metric] = anomalies
+        if len(blocks) > 1:
+            # Column blocks are independent and the NumPy reductions release the GIL
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(blocks))) as executor:
+                results = list(executor.map(self._detect_across_metrics, blocks))
+        else:
+            results = [self._detect_across_metrics(metrics)]
         
-        self.anomalies = [anom for anomaly_list in all_anomalies.values() for anom in anomaly_list]
+        self.anoms = {field: np.concatenate([r[field] for r in results]) for field in ANOMALY_FIELDS}
+        self._anomaly_records = None
+        
+        all_anomalies = {}
+        for anomaly in self.anomalies:
+            all_anomalies.setdefault(anomaly.metric, []).append(anomaly)
         return all_anomalies
     
-    def get_critical_anomalies(self) -> List[Dict]:
+    @property
+    def anomalies(self) -> List[Anomaly]:
+        """All detected anomalies as Anomaly records, materialized on first access"""
+        if self._anomaly_records is None:
+            self._anomaly_records = self._to_records(self.anoms)
+        return self._anomaly_records
+    
+    def _metric_breakdown(self) -> Tuple[List[str], List[int], np.ndarray]:
+        """
+        Per-metric anomaly counts and average absolute deviation
+        Returns (metrics, counts, avg_abs_pct_change) in order of first appearance
+        """
+        codes, metrics = pd.factorize(self.anoms['metric'])
+        counts = np.bincount(codes, minlength=len(metrics))
+        abs_pct_sums = np.bincount(codes, weights=np.abs(self.anoms['pct_change']), minlength=len(metrics))
+        return list(metrics), counts.tolist(), abs_pct_sums / np.maximum(counts, 1)
+    
+    def get_critical_anomalies(self) -> List[Anomaly]:
         """Get only CRITICAL level anomalies"""
-        return [a for a in self.anomalies if a.get('severity') == 'critical']
+        return self._to_records(self.anoms, np.flatnonzero(self.anoms['severity'] == 'critical'))
     
-    def get_top_anomalies(self, n: int = 5, severity: str = None) -> List[Dict]:
+    def get_top_anomalies(self, n: int = 5, severity: str = None) -> List[Anomaly]:
         """
         Get top N anomalies by Z-score
         severity: filter by 'critical', 'warning', 'info', or None for all
         """
-        filtered = self.anomalies
+        z_scores = self.anoms['z_score']
         
         if severity:
-            filtered = [a for a in filtered if a.get('severity') == severity]
-        
-        # Sort by Z-score descending
-        sorted_anomalies = sorted(filtered, key=lambda x: x.get('z_score', 0), reverse=True)
-        
-        return sorted_anomalies[:n]
+            idx = np.flatnonzero(self.anoms['severity'] == severity)
+        else:
+            idx = np.arange(len(z_scores))
+        
+        # Select the N largest Z-scores in linear time, then order just those
+        # by Z-score descending (ties keep detection order)
+        if 0 < n < len(idx):
+            nth_largest = -np.partition(-z_scores[idx], n - 1)[n - 1]
+            idx = idx[z_scores[idx] >= nth_largest]
+        top = idx[np.lexsort((idx, -z_scores[idx]))][:n]
+        
+        top_anomalies = self._to_records(self.anoms, top)
+        for anomaly in top_anomalies:
+            anomaly.text = self._format_anomaly_text(anomaly)
+        return top_anomalies
     
     def generate_anomaly_insights(self) -> List[Dict]:
         """
@@ -230,10 +476,10 @@ class AnomalyDetector:
         insights = []
         
         # Group by severity
-        critical = [a for a in self.anomalies if a.get('severity') == 'critical']
-        warnings = [a for a in self.anomalies if a.get('severity') == 'warning']
+        critical = np.flatnonzero(self.anoms['severity'] == 'critical')
+        warning_count = int(np.count_nonzero(self.anoms['severity'] == 'warning'))
         
-        if critical:
+        if len(critical):
             insight = {
                 'type': 'critical_anomalies',
                 'count': len(critical),
@@ -242,41 +488,33 @@ class AnomalyDetector:
             insights.append(insight)
             
             # Top critical
-            top_critical = sorted(critical, key=lambda x: x.get('z_score', 0), reverse=True)[0]
+            top_idx = critical[np.argmax(self.anoms['z_score'][critical])]
+            top_critical = self._to_records(self.anoms, np.array([top_idx]))[0]
             insight = {
                 'type': 'top_critical_detail',
-                'detail': top_critical,
-                'text': f"Most critical: {top_critical['text']}"
+                'detail': self._anomaly_dict(top_critical),
+                'text': f"Most critical: {self._format_anomaly_text(top_critical)}"
             }
             insights.append(insight)
         
-        if warnings:
+        if warning_count:
             insight = {
                 'type': 'warning_anomalies',
-                'count': len(warnings),
-                'text': f"⚠️  WARNING: {len(warnings)} warning-level anomaly/ies detected"
+                'count': warning_count,
+                'text': f"⚠️  WARNING: {warning_count} warning-level anomaly/ies detected"
             }
             insights.append(insight)
         
         # Metric-specific insights
-        metrics_affected = {}
-        for anomaly in self.anomalies:
-            metric = anomaly.get('metric')
-            if metric not in metrics_affected:
-                metrics_affected[metric] = []
-            metrics_affected[metric].append(anomaly)
-        
-        for metric, anomaly_list in metrics_affected.items():
-            if len(anomaly_list) > 0:
-                avg_pct = np.mean([abs(a.get('pct_change', 0)) for a in anomaly_list])
-                insight = {
-                    'type': f'metric_{metric}',
-                    'metric': metric,
-                    'count': len(anomaly_list),
-                    'avg_deviation': avg_pct,
-                    'text': f"{metric}: {len(anomaly_list)} anomaly/ies detected (avg deviation: {avg_pct:.1f}%)"
-                }
-                insights.append(insight)
+        for metric, count, avg_pct in zip(*self._metric_breakdown()):
+            insight = {
+                'type': f'metric_{metric}',
+                'metric': metric,
+                'count': count,
+                'avg_deviation': avg_pct,
+                'text': f"{metric}: {count} anomaly/ies detected (avg deviation: {avg_pct:.1f}%)"
+            }
+            insights.append(insight)
         
         return insights
     
@@ -297,56 +535,54 @@ class AnomalyDetector:
             recommendations.append(rec)
         
         # By metric recommendations
-        by_metric = {}
-        for anomaly in self.anomalies:
-            metric = anomaly.get('metric')
-            if metric not in by_metric:
-                by_metric[metric] = []
-            by_metric[metric].append(anomaly)
-        
-        for metric, anomalies_list in by_metric.items():
-            if len(anomalies_list) > 2:
+        metrics, counts, _ = self._metric_breakdown()
+        for metric, count in zip(metrics, counts):
+            if count > 2:
                 rec = {
                     'type': f'recurring_anomaly_{metric}',
                     'priority': 'high',
                     'metric': metric,
-                    'text': f"Recurring issue: {metric} has shown {len(anomalies_list)} anomalies. Investigate root cause systematically."
+                    'text': f"Recurring issue: {metric} has shown {count} anomalies. Investigate root cause systematically."
                 }
                 recommendations.append(rec)
         
         # Spike vs drop recommendations
         for anomaly in critical[:3]:  # Top 3 critical
-            if anomaly.get('pct_change', 0) > 0:
+            if anomaly.pct_change > 0:
                 rec = {
                     'type': 'spike_investigation',
                     'priority': 'high',
-                    'detail': anomaly,
-                    'text': f"Positive spike in {anomaly['metric']}: Identify what drove the increase and replicate."
+                    'detail': self._anomaly_dict(anomaly),
+                    'text': f"Positive spike in {anomaly.metric}: Identify what drove the increase and replicate."
                 }
             else:
                 rec = {
                     'type': 'drop_investigation',
                     'priority': 'critical',
-                    'detail': anomaly,
-                    'text': f"Performance drop in {anomaly['metric']}: Identify and fix the root cause immediately."
+                    'detail': self._anomaly_dict(anomaly),
+                    'text': f"Performance drop in {anomaly.metric}: Identify and fix the root cause immediately."
                 }
             recommendations.append(rec)
         
         return recommendations
     
     def get_summary(self) -> Dict:
-        """Generate comprehensive anomaly detection summary"""
-        critical_count = len(self.get_critical_anomalies())
-        warning_count = len([a for a in self.anomalies if a.get('severity') == 'warning'])
-        info_count = len([a for a in self.anomalies if a.get('severity') == 'info'])
+        """
+        Generate comprehensive anomaly detection summary
+        Anomaly records are converted to plain dicts here, for the report and API
+        """
+        severities = self.anoms['severity']
+        critical_count = int(np.count_nonzero(severities == 'critical'))
+        warning_count = int(np.count_nonzero(severities == 'warning'))
+        info_count = int(np.count_nonzero(severities == 'info'))
         
         summary = {
-            'total_anomalies': len(self.anomalies),
+            'total_anomalies': len(severities),
             'critical': critical_count,
             'warning': warning_count,
             'info': info_count,
-            'anomalies': self.anomalies,
-            'top_anomalies': self.get_top_anomalies(5),
+            'anomalies': [self._anomaly_dict(a) for a in self.anomalies],
+            'top_anomalies': [self._anomaly_dict(a) for a in self.get_top_anomalies(5)],
             'insights': self.generate_anomaly_insights(),
             'recommendations': self.generate_anomaly_recommendations()
         }
@@ -360,7 +596,7 @@ class AnomalyDetector:
         print("🚨 Detecting anomalies...")
         
         anomaly_dict = self.detect_all_anomalies(metrics_to_check)
-        print(f"✓ Detected {len(self.anomalies)} total anomalies")
+        print(f"✓ Detected {len(self.anoms['z_score'])} total anomalies")
         
         insights = self.generate_anomaly_insights()
         print(f"✓ Generated {len(insights)} insights")
@@ -3,6 +3,17 @@ from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import os
 from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import hashlib
+import json
+import re
+import shutil
+import threading
+import time
+import traceback
+import uuid
 import sys
 
 # Add backend to path
@@ -36,6 +47,216 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+# Anomaly summaries keyed by content hash of the uploaded files, so repeated
+# uploads of the same CSVs (dashboard refreshes, demos) skip detection.
+# The cache lives in the server process: lookups happen before a job is
+# queued and the worker's summary is stored when the job completes
+SUMMARY_CACHE_SIZE = 32
+SUMMARY_CACHE = OrderedDict()
+summary_cache_lock = threading.Lock()
+
+
+def get_cached_anomaly_summary(key):
+    """Cached anomaly summary for an upload fingerprint, or None"""
+    with summary_cache_lock:
+        if key not in SUMMARY_CACHE:
+            return None
+        SUMMARY_CACHE.move_to_end(key)
+        print(f"  ✓ Reusing cached anomaly summary ({key[:8]})")
+        return SUMMARY_CACHE[key]
+
+
+def cache_anomaly_summary(key, anomaly_summary):
+    """Store an anomaly summary, evicting the least recently used entries"""
+    with summary_cache_lock:
+        SUMMARY_CACHE[key] = anomaly_summary
+        SUMMARY_CACHE.move_to_end(key)
+        while len(SUMMARY_CACHE) > SUMMARY_CACHE_SIZE:
+            SUMMARY_CACHE.popitem(last=False)
+
+
+# Report generation runs in worker processes so /upload returns immediately
+# and several uploads can be processed in parallel across cores
+executor = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+# Job state is kept as one JSON file per job under REPORTS_FOLDER rather than
+# in process memory, so a /result poll can be answered by any server worker
+# (e.g. under gunicorn), not just the one that queued the job
+JOBS_FOLDER = os.path.join(app.config['REPORTS_FOLDER'], 'jobs')
+os.makedirs(JOBS_FOLDER, exist_ok=True)
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+JOB_STATE_TTL_SECONDS = 24 * 60 * 60
+
+
+def job_state_path(job_id):
+    return os.path.join(JOBS_FOLDER, f"{job_id}.json")
+
+
+def write_job_state(job_id, state):
+    """Atomically replace the stored state of a job"""
+    path = job_state_path(job_id)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        # NumPy scalars in the summaries are written as plain numbers
+        json.dump(dict(state, job_id=job_id), f,
+                  default=lambda o: o.item() if hasattr(o, 'item') else str(o))
+    os.replace(tmp_path, path)
+
+
+def read_job_state(job_id):
+    """Stored state of a job, or None for an unknown or malformed job id"""
+    if not JOB_ID_PATTERN.fullmatch(job_id):
+        return None
+    try:
+        with open(job_state_path(job_id), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def prune_job_states():
+    """Delete job state files older than JOB_STATE_TTL_SECONDS"""
+    cutoff = time.time() - JOB_STATE_TTL_SECONDS
+    with os.scandir(JOBS_FOLDER) as entries:
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass  # pruned concurrently by another server worker
+
+
+def run_job(job_id, job_folder, upload_paths, client_name, anomaly_summary=None):
+    """
+    Worker-process entry point: run the pipeline and record the outcome.
+    Returns the anomaly summary so the server process can cache it
+    """
+    try:
+        result, anomaly_summary = run_pipeline(job_id, upload_paths, client_name,
+                                               anomaly_summary)
+    except Exception as e:
+        print(f"✗ Job {job_id} failed: {str(e)}")
+        traceback.print_exc()
+        write_job_state(job_id, {'state': 'error', 'status': 'error', 'message': str(e)})
+        return
+    finally:
+        # The uploaded CSVs are only needed while the job runs
+        shutil.rmtree(job_folder, ignore_errors=True)
+    write_job_state(job_id, dict(result, state='done'))
+    return anomaly_summary
+
+
+def job_finished(job_id, job_folder, cache_key, future):
+    """
+    Cache the anomaly summary of a finished job, and record jobs whose
+    worker process died before it could record them
+    """
+    error = future.exception()
+    if error is not None:
+        shutil.rmtree(job_folder, ignore_errors=True)
+        write_job_state(job_id, {'state': 'error', 'status': 'error', 'message': str(error)})
+        return
+    
+    anomaly_summary = future.result()
+    if anomaly_summary is not None:
+        cache_anomaly_summary(cache_key, anomaly_summary)
+
+
+def run_pipeline(job_id, upload_paths, client_name, anomaly_summary=None):
+    """
+    Run Steps 1-6 for one upload; executed in a worker process.
+    Anomaly detection is skipped when a cached anomaly_summary is given
+    """
+    
+    # =========================================
+    # STEP 1: Data Pipeline
+    # =========================================
+    print("\n[STEP 1] Running Data Pipeline...")
+    pipeline = DataPipeline(upload_paths)
+    combined_df = pipeline.merge_all_data()
+    print(f"  ✓ Combined {len(combined_df)} rows")
+    
+    # =========================================
+    # STEP 2: KPI Calculation
+    # =========================================
+    print("\n[STEP 2] Calculating KPIs...")
+    kpi_calc = KPICalculator(combined_df)
+    kpi_summary = kpi_calc.calculate_all()
+    print(f"  ✓ KPIs calculated")
+    
+    # =========================================
+    # STEP 3: Weather Analysis
+    # =========================================
+    print("\n[STEP 3] Weather Analysis...")
+    weather_analyzer = WeatherAnalyzer(combined_df)
+    weather_summary = {}
+    if weather_analyzer.check_weather_data_available():
+        weather_summary = weather_analyzer.analyze_all()
+        print(f"  ✓ Weather analysis complete")
+    else:
+        print(f"  ⚠️ No weather data available")
+    
+    # =========================================
+    # STEP 4: Anomaly Detection
+    # =========================================
+    print("\n[STEP 4] Anomaly Detection...")
+    if anomaly_summary is None:
+        anomaly_summary = AnomalyDetector(combined_df).analyze_all()
+    print(f"  ✓ Found {anomaly_summary.get('total_anomalies', 0)} anomalies")
+    
+    # =========================================
+    # STEP 5: Benchmarking
+    # =========================================
+    print("\n[STEP 5] Benchmarking...")
+    bench_analyzer = BenchmarkAnalyzer(kpi_summary)
+    bench_summary = bench_analyzer.analyze_all()
+    print(f"  ✓ Benchmarking complete")
+    
+    # =========================================
+    # STEP 6: Report Generation
+    # =========================================
+    print("\n[STEP 6] Generating PDF Report...")
+    report_builder = ReportBuilder(client_name=client_name)
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    report_filename = f"InsightGen_Report_{timestamp}_{job_id[:8]}.pdf"
+    report_path = os.path.join(app.config['REPORTS_FOLDER'], report_filename)
+    
+    report_builder.generate_pdf(
+        report_path,
+        kpi_summary=kpi_summary,
+        weather_summary=weather_summary,
+        anomaly_summary=anomaly_summary,
+        bench_summary=bench_summary
+    )
+    print(f"  ✓ Report saved: {report_filename}")
+    
+    # =========================================
+    # Return Summary
+    # =========================================
+    return {
+        'status': 'success',
+        'message': 'Report generated successfully',
+        'client_name': client_name,
+        'report_file': report_filename,
+        'summary': {
+            'kpis': {
+                'total_conversions': kpi_summary['overall'].get('total_conversions'),
+                'total_revenue': kpi_summary['overall'].get('total_revenue'),
+                'avg_ctr': kpi_summary['overall'].get('ctr'),
+                'avg_roas': kpi_summary['overall'].get('roas')
+            },
+            'anomalies': {
+                'total': anomaly_summary.get('total_anomalies', 0),
+                'critical': anomaly_summary.get('critical', 0)
+            },
+            'benchmarking': {
+                'strengths': len(bench_summary.get('strengths', []))
+            }
+        }
+    }, anomaly_summary
+
+
 # ============================================
 # ROUTES - Define after app initialized
 # ============================================
@@ -60,7 +281,7 @@ def status():
 
 @app.route('/upload', methods=['POST'])
 def upload_and_generate():
-    """Main endpoint: Upload CSVs and generate complete report"""
+    """Main endpoint: Upload CSVs and queue report generation; returns a job id"""
     
     try:
         if 'files' not in request.files:
@@ -74,110 +295,48 @@ def upload_and_generate():
         
         print(f"\n📥 Received {len(files)} files from client: {client_name}")
         
-        # Save uploaded files
-        upload_paths = {}
-        for file in files:
-            if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
-                upload_paths[filename] = filepath
-                print(f"  ✓ Saved: {filename}")
-        
-        if not upload_paths:
+        csv_files = [file for file in files if file and allowed_file(file.filename)]
+        if not csv_files:
             return jsonify({'error': 'No valid CSV files uploaded'}), 400
         
-        # =========================================
-        # STEP 1: Data Pipeline
-        # =========================================
-        print("\n[STEP 1] Running Data Pipeline...")
-        pipeline = DataPipeline(upload_paths)
-        combined_df = pipeline.merge_all_data()
-        print(f"  ✓ Combined {len(combined_df)} rows")
-        
-        # =========================================
-        # STEP 2: KPI Calculation
-        # =========================================
-        print("\n[STEP 2] Calculating KPIs...")
-        kpi_calc = KPICalculator(combined_df)
-        kpi_summary = kpi_calc.calculate_all()
-        print(f"  ✓ KPIs calculated")
+        prune_job_states()
         
-        # =========================================
-        # STEP 3: Weather Analysis
-        # =========================================
-        print("\n[STEP 3] Weather Analysis...")
-        weather_analyzer = WeatherAnalyzer(combined_df)
-        weather_summary = {}
-        if weather_analyzer.check_weather_data_available():
-            weather_summary = weather_analyzer.analyze_all()
-            print(f"  ✓ Weather analysis complete")
-        else:
-            print(f"  ⚠️ No weather data available")
+        # Save uploaded files (one folder per job so concurrent uploads
+        # with the same filenames don't overwrite each other)
+        job_id = uuid.uuid4().hex
+        job_folder = os.path.join(app.config['UPLOAD_FOLDER'], job_id)
+        os.makedirs(job_folder, exist_ok=True)
         
-        # =========================================
-        # STEP 4: Anomaly Detection
-        # =========================================
-        print("\n[STEP 4] Anomaly Detection...")
-        anomaly_detector = AnomalyDetector(combined_df)
-        anomaly_summary = anomaly_detector.analyze_all()
-        print(f"  ✓ Found {anomaly_summary.get('total_anomalies', 0)} anomalies")
-        
-        # =========================================
-        # STEP 5: Benchmarking
-        # =========================================
-        print("\n[STEP 5] Benchmarking...")
-        bench_analyzer = BenchmarkAnalyzer(kpi_summary)
-        bench_summary = bench_analyzer.analyze_all()
-        print(f"  ✓ Benchmarking complete")
-        
-        # =========================================
-        # STEP 6: Report Generation
-        # =========================================
-        print("\n[STEP 6] Generating PDF Report...")
-        report_builder = ReportBuilder(client_name=client_name)
+        upload_paths = {}
+        fingerprint = hashlib.blake2b(digest_size=16)
+        for file in csv_files:
+            filename = secure_filename(file.filename)
+            filepath = os.path.join(job_folder, filename)
+            file.save(filepath)
+            upload_paths[filename] = filepath
+            print(f"  ✓ Saved: {filename}")
+            
+            fingerprint.update(filename.encode() + b'\0')
+            with open(filepath, 'rb') as f:
+                fingerprint.update(hashlib.file_digest(f, 'blake2b').digest())
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        report_filename = f"InsightGen_Report_{timestamp}.pdf"
-        report_path = os.path.join(app.config['REPORTS_FOLDER'], report_filename)
+        cache_key = fingerprint.hexdigest()
+        anomaly_summary = get_cached_anomaly_summary(cache_key)
         
-        report_builder.generate_pdf(
-            report_path,
-            kpi_summary=kpi_summary,
-            weather_summary=weather_summary,
-            anomaly_summary=anomaly_summary,
-            bench_summary=bench_summary
-        )
-        print(f"  ✓ Report saved: {report_filename}")
+        write_job_state(job_id, {'state': 'running'})
+        future = executor.submit(run_job, job_id, job_folder, upload_paths, client_name,
+                                 anomaly_summary)
+        future.add_done_callback(partial(job_finished, job_id, job_folder, cache_key))
+        print(f"  ✓ Queued job {job_id}")
         
-        # =========================================
-        # Return Success
-        # =========================================
         return jsonify({
-            'status': 'success',
-            'message': 'Report generated successfully',
-            'client_name': client_name,
-            'report_file': report_filename,
-            'summary': {
-                'kpis': {
-                    'total_conversions': kpi_summary['overall'].get('total_conversions'),
-                    'total_revenue': kpi_summary['overall'].get('total_revenue'),
-                    'avg_ctr': kpi_summary['overall'].get('ctr'),
-                    'avg_roas': kpi_summary['overall'].get('roas')
-                },
-                'anomalies': {
-                    'total': anomaly_summary.get('total_anomalies', 0),
-                    'critical': anomaly_summary.get('critical', 0)
-                },
-                'benchmarking': {
-                    'strengths': len(bench_summary.get('strengths', []))
-                }
-            }
-        })
+            'status': 'queued',
+            'job_id': job_id,
+            'client_name': client_name
+        }), 202
     
     except Exception as e:
         print(f"✗ Error: {str(e)}")
-        import traceback
         traceback.print_exc()
         return jsonify({
             'status': 'error',
@@ -185,6 +344,22 @@ def upload_and_generate():
         }), 500
 
 
+@app.route('/result/<job_id>', methods=['GET'])
+def get_result(job_id):
+    """Poll a queued report job"""
+    state = read_job_state(job_id)
+    if state is None:
+        return jsonify({'error': 'Unknown job id'}), 404
+    
+    if state['state'] == 'running':
+        return jsonify(state), 202
+    
+    if state['state'] == 'error':
+        return jsonify(state), 500
+    
+    return jsonify(state)
+
+
 # ============================================
 # ERROR HANDLERS
 # ============================================
@@ -213,6 +388,7 @@ if __name__ == '__main__':
     
     🌐 Frontend: http://localhost:5000
     📡 API: http://localhost:5000/upload
+    📊 Jobs: http://localhost:5000/result/<job_id>
     
     """)
     
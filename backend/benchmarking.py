@@ -1,7 +1,182 @@
 import pandas as pd
+import numpy as np
 import json
 import os
-from typing import Dict, List, Tuple
+import heapq
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, asdict
+from operator import itemgetter
+from typing import Dict, Iterator, List, Tuple
+
+try:
+    import orjson  # faster JSON parsing; optional
+except ImportError:
+    orjson = None
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; the NumPy comparison is used instead
+    njit = None
+
+# compare_by_channel switches to the compiled kernel from this many channels;
+# below it the NumPy version is faster than the call overhead
+NUMBA_MIN_CHANNELS = 100
+
+# Parsed benchmark files keyed by (absolute path, mtime in ns), shared by all
+# BenchmarkAnalyzer instances; editing the file changes the key
+BENCHMARK_CACHE: Dict[Tuple[str, int], Dict] = {}
+
+# KPI names and the benchmark keys they are compared against
+KPI_BENCH_MAP = {
+    'ctr': 'avg_ctr',
+    'cpc': 'avg_cpc',
+    'cvr': 'avg_conversion_rate',
+    'cpa': 'avg_cpa',
+    'roas': 'avg_roas',
+}
+
+# Cost metrics, where being below the benchmark is better
+COST_METRICS = frozenset({'cpc', 'cpa'})
+
+# Emoji badge per performance tier
+BADGES = {
+    'top_20': '🏆 Top 20%',
+    'top_40': '✅ Top 40%',
+    'in_line': '➖ Inline',
+    'average': '📊 Average',
+    'bottom_40': '⚠️ Below Average',
+    'bottom_20': '🔴 Bottom 20%',
+}
+
+# Recommendation for a weak metric: (type, priority, text template with {gap});
+# metrics without an entry get no recommendation
+REC_TEMPLATES = {
+    'ctr': ('improve_ctr', 'high',
+            "CTR is {gap:.1f}% below benchmark. Test new ad copy, landing pages, and targeting to improve click-through."),
+    'cpc': ('reduce_cpc', 'high',
+            "CPC is {gap:.1f}% above benchmark. Refine audience targeting and bid strategy to reduce cost per click."),
+    'cvr': ('improve_cvr', 'high',
+            "Conversion rate is {gap:.1f}% below benchmark. Optimize landing pages, reduce friction, and A/B test conversion flows."),
+    'roas': ('improve_roas', 'high',
+             "ROAS is {gap:.1f}% below benchmark. Focus on high-AOV products, improve targeting, and allocate budget to best performers."),
+}
+
+# Recommendation for the strongest metric, filled with {metric} and {pct}
+SCALE_REC_TEMPLATE = ("Scale winner: {metric} is {pct:.1f}% above benchmark. "
+                      "Increase budget allocation to this channel/campaign.")
+
+# Percentile rank by pct_difference: a value strictly above the i-th threshold
+# (and no higher one) gets PERCENTILE_RANKS[i + 1]
+PERCENTILE_RANK_THRESHOLDS = (-30, -20, -10, 0, 10, 20, 30)
+PERCENTILE_RANKS = ('Bottom 5%', 'Bottom 10%', 'Bottom 25%', 'Bottom 50%',
+                    'Top 50%', 'Top 25%', 'Top 10%', 'Top 5%')
+
+# Performance tiers by pct_difference bin (see the *_TIER_THRESHOLDS below)
+TIER_NAMES = np.array(['bottom_20', 'bottom_40', 'average', 'in_line', 'average', 'top_40', 'top_20'])
+AVERAGE_TIER = 2
+
+# Tier bin edges for np.searchsorted(side='left'): a pct_difference lands in
+# bin i when exactly i thresholds are below it. Edges where the value itself
+# belongs to the upper bin ('<' in the original ladder) sit one ulp lower.
+OVERALL_TIER_THRESHOLDS = np.array([
+    np.nextafter(-20, -np.inf),  # below -20%: bottom_20
+    np.nextafter(-10, -np.inf),  # below -10%: bottom_40
+    -5,                          # within 5%: in_line, otherwise average
+    np.nextafter(5, -np.inf),
+    10,                          # above 10%: top_40
+    20,                          # above 20%: top_20
+])
+CHANNEL_TIER_THRESHOLDS = np.array([
+    np.nextafter(-15, -np.inf),  # below -15%: bottom_20
+    np.nextafter(-5, -np.inf),   # below -5%: bottom_40
+    -5,                          # within 5%: in_line, exactly +-5%: average
+    np.nextafter(5, -np.inf),
+    5,                           # above 5%: top_40
+    15,                          # above 15%: top_20
+])
+
+
+@dataclass(slots=True)
+class ChannelMetricComparison:
+    """One KPI of one channel compared against its benchmark"""
+    client_value: float
+    benchmark_value: float
+    pct_difference: float
+    tier: str
+    badge: str
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class MetricComparison:
+    """One overall KPI compared against its benchmark"""
+    client_value: float
+    benchmark_value: float
+    difference: float
+    pct_difference: float
+    status: str
+    performance: str
+    tier: str
+    badge: str
+    text: str
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _compare_values(client_values: np.ndarray, benchmark_values: np.ndarray,
+                    thresholds: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized client vs benchmark comparison, for arrays of any shape
+    Returns (difference, pct_difference, tier); pct_difference is 0 for zero benchmarks
+    """
+    differences = client_values - benchmark_values
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct_differences = np.where(benchmark_values != 0, differences / benchmark_values * 100, 0.0)
+    
+    tier_idx = np.searchsorted(thresholds, pct_differences, side='left')
+    # NaN fails every comparison in the tier ladder, which leaves it 'average'
+    tier_idx[np.isnan(pct_differences)] = AVERAGE_TIER
+    return differences, pct_differences, TIER_NAMES[tier_idx]
+
+
+def _channel_tier_loops(client_values, benchmark_values, thresholds, average_tier):
+    """
+    pct_difference and tier index for 2-D arrays, as explicit loops for Numba
+    Same results as _compare_values (tier index instead of tier name)
+    """
+    n_rows, n_cols = client_values.shape
+    pct_differences = np.zeros((n_rows, n_cols))
+    tier_idx = np.empty((n_rows, n_cols), dtype=np.int64)
+    
+    for i in range(n_rows):
+        for j in range(n_cols):
+            benchmark_value = benchmark_values[i, j]
+            pct = 0.0
+            if benchmark_value != 0:
+                pct = (client_values[i, j] - benchmark_value) / benchmark_value * 100
+            pct_differences[i, j] = pct
+            
+            # Number of thresholds strictly below pct, like np.searchsorted(side='left')
+            tier = 0
+            for k in range(len(thresholds)):
+                if pct > thresholds[k]:
+                    tier = k + 1
+            if pct != pct:  # NaN
+                tier = average_tier
+            tier_idx[i, j] = tier
+    
+    return pct_differences, tier_idx
+
+
+if njit is not None:
+    _channel_tier_kernel = njit(cache=True)(_channel_tier_loops)
+else:
+    _channel_tier_kernel = None
+
 
 class BenchmarkAnalyzer:
     """
@@ -21,6 +196,12 @@ class BenchmarkAnalyzer:
         self.comparisons = {}
         self.insights = []
         self.recommendations = []
+        self.strengths = None
+        self.weaknesses = None
+        self._bench_table = None
+        # Memoized get_strengths/get_weaknesses/get_percentile_rank results,
+        # reset whenever the overall comparison is recomputed
+        self._cache = {}
     
     def _load_benchmarks(self, benchmarks_file: str) -> Dict:
         """
@@ -42,15 +223,22 @@ class BenchmarkAnalyzer:
             return {}
         
         try:
-            with open(benchmarks_file, 'r') as f:
-                benchmarks = json.load(f)
+            key = (os.path.abspath(benchmarks_file), os.stat(benchmarks_file).st_mtime_ns)
+            if key in BENCHMARK_CACHE:
+                # The cached dict is shared, which is fine since it is only read
+                return BENCHMARK_CACHE[key]
+            
+            with open(benchmarks_file, 'rb') as f:
+                data = f.read()
+            benchmarks = orjson.loads(data) if orjson is not None else json.loads(data)
+            BENCHMARK_CACHE[key] = benchmarks
             print(f"✓ Loaded benchmarks from {benchmarks_file}")
             return benchmarks
         except Exception as e:
             print(f"✗ Error loading benchmarks: {e}")
             return {}
     
-    def compare_overall_metrics(self) -> Dict:
+    def compare_overall_metrics(self) -> Dict[str, MetricComparison]:
         """
         Compare overall KPIs against overall benchmarks
         Returns comparison with percentile ranking
@@ -64,62 +252,52 @@ class BenchmarkAnalyzer:
         
         comparison = {}
         
-        # Map KPI names to benchmark names
-        kpi_bench_map = {
-            'ctr': 'avg_ctr',
-            'cpc': 'avg_cpc',
-            'cvr': 'avg_conversion_rate',
-            'cpa': 'avg_cpa',
-            'roas': 'avg_roas',
-        }
-        
-        for kpi_name, bench_name in kpi_bench_map.items():
-            client_value = overall_kpis.get(kpi_name)
-            benchmark_value = overall_bench.get(bench_name)
+        # Compare every metric that has both a client value and a benchmark at once
+        kpi_names = [kpi_name for kpi_name, bench_name in KPI_BENCH_MAP.items()
+                     if overall_kpis.get(kpi_name) is not None and overall_bench.get(bench_name) is not None]
+        client_values = [overall_kpis[kpi_name] for kpi_name in kpi_names]
+        benchmark_values = [overall_bench[KPI_BENCH_MAP[kpi_name]] for kpi_name in kpi_names]
+        
+        differences, pct_differences, tiers = _compare_values(
+            np.array(client_values, dtype=np.float64),
+            np.array(benchmark_values, dtype=np.float64),
+            OVERALL_TIER_THRESHOLDS
+        )
+        
+        # Status: above/below benchmark; for cost metrics below is better
+        above = differences > 0
+        better = above != np.array([kpi_name in COST_METRICS for kpi_name in kpi_names], dtype=bool)
+        
+        differences = differences.tolist()
+        pct_differences = pct_differences.tolist()
+        tiers = tiers.tolist()
+        
+        for i, kpi_name in enumerate(kpi_names):
+            client_value = client_values[i]
+            benchmark_value = benchmark_values[i]
+            pct_difference = pct_differences[i]
+            tier = tiers[i]
+            badge = self._get_badge(tier)
             
-            if client_value is not None and benchmark_value is not None:
-                # Calculate difference and percentile
-                difference = client_value - benchmark_value
-                pct_difference = (difference / benchmark_value * 100) if benchmark_value != 0 else 0
-                
-                # Determine status (for cost metrics, lower is better)
-                if kpi_name in ['cpc', 'cpa']:
-                    status = 'above' if difference > 0 else 'below'  # below = better for costs
-                    performance = 'worse' if difference > 0 else 'better'
-                else:
-                    status = 'above' if difference > 0 else 'below'  # above = better for rates
-                    performance = 'better' if difference > 0 else 'worse'
-                
-                # Determine percentile tier
-                if abs(pct_difference) < 5:
-                    tier = 'in_line'
-                elif pct_difference > 20:
-                    tier = 'top_20'
-                elif pct_difference > 10:
-                    tier = 'top_40'
-                elif pct_difference < -20:
-                    tier = 'bottom_20'
-                elif pct_difference < -10:
-                    tier = 'bottom_40'
-                else:
-                    tier = 'average'
-                
-                comparison[kpi_name] = {
-                    'client_value': client_value,
-                    'benchmark_value': benchmark_value,
-                    'difference': difference,
-                    'pct_difference': pct_difference,
-                    'status': status,
-                    'performance': performance,
-                    'tier': tier,
-                    'badge': self._get_badge(tier),
-                    'text': f"{kpi_name.upper()}: {client_value:.2f} vs benchmark {benchmark_value:.2f} ({pct_difference:+.1f}%) {self._get_badge(tier)}"
-                }
+            comparison[kpi_name] = MetricComparison(
+                client_value=client_value,
+                benchmark_value=benchmark_value,
+                difference=differences[i],
+                pct_difference=pct_difference,
+                status='above' if above[i] else 'below',
+                performance='better' if better[i] else 'worse',
+                tier=tier,
+                badge=badge,
+                text=f"{kpi_name.upper()}: {client_value:.2f} vs benchmark {benchmark_value:.2f} ({pct_difference:+.1f}%) {badge}"
+            )
         
         self.comparisons['overall'] = comparison
+        self._cache.clear()
+        self.strengths = None
+        self.weaknesses = None
         return comparison
     
-    def compare_by_channel(self) -> Dict[str, Dict]:
+    def compare_by_channel(self) -> Dict[str, Dict[str, ChannelMetricComparison]]:
         """
         Compare channel KPIs against channel-specific benchmarks
         """
@@ -129,127 +307,156 @@ class BenchmarkAnalyzer:
         channel_comparisons = {}
         client_channels = self.kpi_summary.get('by_channel', {})
         
-        for channel, client_kpi in client_channels.items():
-            # Check if channel benchmarks exist
-            channel_bench = self.benchmarks.get(channel, {})
-            
-            if not channel_bench:
-                # Fall back to overall benchmarks
-                channel_bench = self.benchmarks.get('overall', {})
-            
+        # Client KPIs as a (channels x KPIs) frame, aligned with a frame holding
+        # each channel's benchmark row; missing values are NaN and not compared
+        kpi_names = list(KPI_BENCH_MAP)
+        client_df = pd.DataFrame.from_dict(client_channels, orient='index').reindex(
+            index=list(client_channels), columns=kpi_names)
+        
+        # A client KPI is compared when it is set, as in compare_overall_metrics;
+        # taken from the dicts since reindex also turns None/missing into NaN,
+        # while a NaN value is still compared (and rated 'average')
+        client_present = np.array([[client_kpi.get(kpi_name) is not None for kpi_name in kpi_names]
+                                   for client_kpi in client_channels.values()],
+                                  dtype=bool).reshape(len(client_df), len(kpi_names))
+        
+        # Channels without their own benchmarks fall back to overall benchmarks
+        bench_table = self._get_bench_table()
+        bench_rows = client_df.index.where(client_df.index.isin(bench_table.index), 'overall')
+        bench_df = bench_table.reindex(bench_rows)
+        
+        client_values = client_df.to_numpy(dtype=np.float64, na_value=np.nan)
+        benchmark_values = bench_df.to_numpy(dtype=np.float64, na_value=np.nan)
+        present = client_present & ~np.isnan(benchmark_values)
+        
+        if _channel_tier_kernel is not None and len(client_df) >= NUMBA_MIN_CHANNELS:
+            pct_differences, tier_idx = _channel_tier_kernel(
+                client_values, benchmark_values, CHANNEL_TIER_THRESHOLDS, AVERAGE_TIER)
+            tiers = TIER_NAMES[tier_idx]
+        else:
+            _, pct_differences, tiers = _compare_values(client_values, benchmark_values, CHANNEL_TIER_THRESHOLDS)
+        
+        # Nested dict output is built only here, at the boundary
+        client_values = client_values.tolist()
+        benchmark_values = benchmark_values.tolist()
+        pct_differences = pct_differences.tolist()
+        tiers = tiers.tolist()
+        for i, channel in enumerate(client_df.index):
             channel_comparison = {}
-            
-            kpi_bench_map = {
-                'ctr': 'avg_ctr',
-                'cpc': 'avg_cpc',
-                'cvr': 'avg_conversion_rate',
-                'cpa': 'avg_cpa',
-                'roas': 'avg_roas',
-            }
-            
-            for kpi_name, bench_name in kpi_bench_map.items():
-                client_value = client_kpi.get(kpi_name)
-                benchmark_value = channel_bench.get(bench_name)
-                
-                if client_value is not None and benchmark_value is not None:
-                    difference = client_value - benchmark_value
-                    pct_difference = (difference / benchmark_value * 100) if benchmark_value != 0 else 0
-                    
-                    if kpi_name in ['cpc', 'cpa']:
-                        status = 'above' if difference > 0 else 'below'
-                    else:
-                        status = 'above' if difference > 0 else 'below'
-                    
-                    # Determine tier
-                    if abs(pct_difference) < 5:
-                        tier = 'in_line'
-                    elif pct_difference > 15:
-                        tier = 'top_20'
-                    elif pct_difference > 5:
-                        tier = 'top_40'
-                    elif pct_difference < -15:
-                        tier = 'bottom_20'
-                    elif pct_difference < -5:
-                        tier = 'bottom_40'
-                    else:
-                        tier = 'average'
-                    
-                    channel_comparison[kpi_name] = {
-                        'client_value': client_value,
-                        'benchmark_value': benchmark_value,
-                        'pct_difference': pct_difference,
-                        'tier': tier,
-                        'badge': self._get_badge(tier),
-                    }
+            for j, kpi_name in enumerate(kpi_names):
+                if present[i, j]:
+                    tier = tiers[i][j]
+                    channel_comparison[kpi_name] = ChannelMetricComparison(
+                        client_value=client_values[i][j],
+                        benchmark_value=benchmark_values[i][j],
+                        pct_difference=pct_differences[i][j],
+                        tier=tier,
+                        badge=self._get_badge(tier),
+                    )
             
             channel_comparisons[channel] = channel_comparison
         
         self.comparisons['by_channel'] = channel_comparisons
         return channel_comparisons
     
+    def _get_bench_table(self) -> pd.DataFrame:
+        """
+        Benchmarks as a (benchmark set x KPI) frame, built once per analyzer
+        Only non-empty benchmark sets are included, so any channel missing
+        from the index uses the 'overall' row
+        """
+        if self._bench_table is None:
+            bench_table = pd.DataFrame.from_dict(
+                {name: bench for name, bench in self.benchmarks.items() if bench and isinstance(bench, dict)},
+                orient='index'
+            ).reindex(columns=list(KPI_BENCH_MAP.values()))
+            bench_table.columns = list(KPI_BENCH_MAP)
+            self._bench_table = bench_table
+        return self._bench_table
+    
     def _get_badge(self, tier: str) -> str:
         """
         Return emoji badge based on performance tier
         """
-        badges = {
-            'top_20': '🏆 Top 20%',
-            'top_40': '✅ Top 40%',
-            'in_line': '➖ Inline',
-            'average': '📊 Average',
-            'bottom_40': '⚠️ Below Average',
-            'bottom_20': '🔴 Bottom 20%',
-        }
-        return badges.get(tier, '❓')
+        return BADGES.get(tier, '❓')
     
     def get_strengths(self, min_pct_above: float = 10) -> List[Dict]:
         """
         Identify metrics where client outperforms benchmark
         min_pct_above: minimum percentage above benchmark to be considered a strength
         """
-        strengths = []
+        key = ('strengths', min_pct_above)
+        if key in self._cache:
+            return self._cache[key]
         
+        # Sort by pct_difference descending
+        strengths = sorted(self._iter_strengths(min_pct_above), key=itemgetter('pct_above'), reverse=True)
+        self._cache[key] = strengths
+        return strengths
+    
+    def _iter_strengths(self, min_pct_above: float) -> Iterator[Dict]:
+        """Yield unsorted strength records for get_strengths"""
         overall_comp = self.comparisons.get('overall', {})
         
         for metric, data in overall_comp.items():
-            if data['pct_difference'] > min_pct_above:
-                strength = {
+            if data.pct_difference > min_pct_above:
+                yield {
                     'metric': metric,
-                    'client_value': data['client_value'],
-                    'benchmark_value': data['benchmark_value'],
-                    'pct_above': data['pct_difference'],
-                    'tier': data['tier'],
-                    'text': f"✅ {metric.upper()} strength: {data['pct_difference']:.1f}% above benchmark"
+                    'client_value': data.client_value,
+                    'benchmark_value': data.benchmark_value,
+                    'pct_above': data.pct_difference,
+                    'tier': data.tier,
+                    'text': f"✅ {metric.upper()} strength: {data.pct_difference:.1f}% above benchmark"
                 }
-                strengths.append(strength)
-        
-        # Sort by pct_difference descending
-        strengths.sort(key=lambda x: x['pct_above'], reverse=True)
-        return strengths
     
     def get_weaknesses(self, max_pct_below: float = -10) -> List[Dict]:
         """
         Identify metrics where client underperforms benchmark
         max_pct_below: maximum percentage below benchmark to be considered a weakness
         """
-        weaknesses = []
+        key = ('weaknesses', max_pct_below)
+        if key in self._cache:
+            return self._cache[key]
         
+        # Sort by pct_below descending
+        weaknesses = sorted(self._iter_weaknesses(max_pct_below), key=itemgetter('pct_below'), reverse=True)
+        self._cache[key] = weaknesses
+        return weaknesses
+    
+    def _iter_weaknesses(self, max_pct_below: float) -> Iterator[Dict]:
+        """Yield unsorted weakness records for get_weaknesses"""
         overall_comp = self.comparisons.get('overall', {})
         
         for metric, data in overall_comp.items():
-            if data['pct_difference'] < max_pct_below:
-                weakness = {
+            if data.pct_difference < max_pct_below:
+                yield {
                     'metric': metric,
-                    'client_value': data['client_value'],
-                    'benchmark_value': data['benchmark_value'],
-                    'pct_below': abs(data['pct_difference']),
-                    'tier': data['tier'],
-                    'text': f"🔴 {metric.upper()} weakness: {abs(data['pct_difference']):.1f}% below benchmark"
+                    'client_value': data.client_value,
+                    'benchmark_value': data.benchmark_value,
+                    'pct_below': abs(data.pct_difference),
+                    'tier': data.tier,
+                    'text': f"🔴 {metric.upper()} weakness: {abs(data.pct_difference):.1f}% below benchmark"
                 }
-                weaknesses.append(weakness)
-        
-        # Sort by pct_below descending
-        weaknesses.sort(key=lambda x: x['pct_below'], reverse=True)
-        return weaknesses
+    
+    def _top_strengths(self, k: int, min_pct_above: float = 10) -> List[Dict]:
+        """
+        First k entries of get_strengths(min_pct_above)
+        Partial selection with heapq unless the full sorted list is already cached
+        """
+        cached = self._cache.get(('strengths', min_pct_above))
+        if cached is not None:
+            return cached[:k]
+        return heapq.nlargest(k, self._iter_strengths(min_pct_above), key=itemgetter('pct_above'))
+    
+    def _top_weaknesses(self, k: int, max_pct_below: float = -10) -> List[Dict]:
+        """
+        First k entries of get_weaknesses(max_pct_below)
+        Partial selection with heapq unless the full sorted list is already cached
+        """
+        cached = self._cache.get(('weaknesses', max_pct_below))
+        if cached is not None:
+            return cached[:k]
+        return heapq.nlargest(k, self._iter_weaknesses(max_pct_below), key=itemgetter('pct_below'))
     
     def generate_benchmark_insights(self) -> List[Dict]:
         """
@@ -259,10 +466,10 @@ class BenchmarkAnalyzer:
         
         overall_comp = self.comparisons.get('overall', {})
         
-        # Count performance tiers
-        top_20 = len([m for m in overall_comp.values() if m['tier'] == 'top_20'])
-        top_40 = len([m for m in overall_comp.values() if m['tier'] == 'top_40'])
-        bottom_20 = len([m for m in overall_comp.values() if m['tier'] == 'bottom_20'])
+        # Count performance tiers in a single pass
+        tier_counts = Counter(m.tier for m in overall_comp.values())
+        top_20 = tier_counts['top_20']
+        bottom_20 = tier_counts['bottom_20']
         
         # Overall performance summary
         if top_20 > 0:
@@ -279,19 +486,23 @@ class BenchmarkAnalyzer:
             }
             insights.append(insight)
         
-        # Strength/weakness summary
-        strengths = self.get_strengths()
+        # Strength/weakness summary; the full lists are kept for get_summary and
+        # let the recommendations slice instead of selecting again
+        self.strengths = self.get_strengths()
+        self.weaknesses = self.get_weaknesses()
+        
+        strengths = self._top_strengths(2)
         if strengths:
-            strong_metrics = ', '.join([s['metric'].upper() for s in strengths[:2]])
+            strong_metrics = ', '.join([s['metric'].upper() for s in strengths])
             insight = {
                 'type': 'key_strengths',
                 'text': f"💪 Key strengths: {strong_metrics} significantly outperform benchmarks"
             }
             insights.append(insight)
         
-        weaknesses = self.get_weaknesses()
+        weaknesses = self._top_weaknesses(2)
         if weaknesses:
-            weak_metrics = ', '.join([w['metric'].upper() for w in weaknesses[:2]])
+            weak_metrics = ', '.join([w['metric'].upper() for w in weaknesses])
             insight = {
                 'type': 'key_weaknesses',
                 'text': f"⚡ Improvement areas: {weak_metrics} underperform benchmarks—prioritize optimization"
@@ -307,55 +518,34 @@ class BenchmarkAnalyzer:
         """
         recommendations = []
         
-        weaknesses = self.get_weaknesses()
-        strengths = self.get_strengths()
+        weaknesses = self._top_weaknesses(3)
+        strengths = self._top_strengths(1)
         
         # Recommendations for weak areas
-        for weakness in weaknesses[:3]:
+        for weakness in weaknesses:
             metric = weakness['metric']
-            gap = weakness['pct_below']
-            
-            if metric == 'ctr':
-                rec = {
-                    'type': 'improve_ctr',
-                    'priority': 'high',
-                    'metric': metric,
-                    'text': f"CTR is {gap:.1f}% below benchmark. Test new ad copy, landing pages, and targeting to improve click-through."
-                }
-            elif metric == 'cpc':
-                rec = {
-                    'type': 'reduce_cpc',
-                    'priority': 'high',
-                    'metric': metric,
-                    'text': f"CPC is {gap:.1f}% above benchmark. Refine audience targeting and bid strategy to reduce cost per click."
-                }
-            elif metric == 'cvr':
-                rec = {
-                    'type': 'improve_cvr',
-                    'priority': 'high',
-                    'metric': metric,
-                    'text': f"Conversion rate is {gap:.1f}% below benchmark. Optimize landing pages, reduce friction, and A/B test conversion flows."
-                }
-            elif metric == 'roas':
-                rec = {
-                    'type': 'improve_roas',
-                    'priority': 'high',
-                    'metric': metric,
-                    'text': f"ROAS is {gap:.1f}% below benchmark. Focus on high-AOV products, improve targeting, and allocate budget to best performers."
-                }
-            else:
+            template = REC_TEMPLATES.get(metric)
+            if template is None:
                 continue
             
+            rec_type, priority, text = template
+            rec = {
+                'type': rec_type,
+                'priority': priority,
+                'metric': metric,
+                'text': text.format_map({'gap': weakness['pct_below']})
+            }
             recommendations.append(rec)
         
         # Recommendations for strong areas
         if strengths:
-            strong_metric = strengths[0]['metric']
-            strong_pct = strengths[0]['pct_above']
             rec = {
                 'type': 'scale_success',
                 'priority': 'medium',
-                'text': f"Scale winner: {strong_metric.upper()} is {strong_pct:.1f}% above benchmark. Increase budget allocation to this channel/campaign."
+                'text': SCALE_REC_TEMPLATE.format_map({
+                    'metric': strengths[0]['metric'].upper(),
+                    'pct': strengths[0]['pct_above'],
+                })
             }
             recommendations.append(rec)
         
@@ -366,67 +556,76 @@ class BenchmarkAnalyzer:
         """
         Get a simple percentile rank description
         """
+        key = ('percentile_rank', metric)
+        if key not in self._cache:
+            self._cache[key] = self._percentile_rank(metric)
+        return self._cache[key]
+    
+    def _percentile_rank(self, metric: str) -> str:
+        """Uncached get_percentile_rank"""
         overall_comp = self.comparisons.get('overall', {})
         
         if metric not in overall_comp:
             return "Unknown"
         
-        pct_diff = overall_comp[metric]['pct_difference']
-        
-        if pct_diff > 30:
-            return "Top 5%"
-        elif pct_diff > 20:
-            return "Top 10%"
-        elif pct_diff > 10:
-            return "Top 25%"
-        elif pct_diff > 0:
-            return "Top 50%"
-        elif pct_diff > -10:
-            return "Bottom 50%"
-        elif pct_diff > -20:
-            return "Bottom 25%"
-        elif pct_diff > -30:
-            return "Bottom 10%"
-        else:
-            return "Bottom 5%"
+        # bisect_left counts the thresholds strictly below pct_difference
+        pct_diff = overall_comp[metric].pct_difference
+        return PERCENTILE_RANKS[bisect_left(PERCENTILE_RANK_THRESHOLDS, pct_diff)]
     
     def get_summary(self) -> Dict:
-        """Generate comprehensive benchmarking summary"""
+        """
+        Generate comprehensive benchmarking summary
+        Comparison records are converted to plain dicts here, for the report and API
+        """
+        overall_comp = self.comparisons.get('overall', {})
+        channel_comp = self.comparisons.get('by_channel', {})
+        
         summary = {
-            'overall_comparison': self.comparisons.get('overall', {}),
-            'by_channel_comparison': self.comparisons.get('by_channel', {}),
-            'strengths': self.get_strengths(),
-            'weaknesses': self.get_weaknesses(),
+            'overall_comparison': {metric: comp.to_dict() for metric, comp in overall_comp.items()},
+            'by_channel_comparison': {
+                channel: {metric: comp.to_dict() for metric, comp in comparison.items()}
+                for channel, comparison in channel_comp.items()
+            },
+            'strengths': self.strengths if self.strengths is not None else self.get_strengths(),
+            'weaknesses': self.weaknesses if self.weaknesses is not None else self.get_weaknesses(),
             'insights': self.insights,
             'recommendations': self.recommendations,
             'benchmarks_loaded': bool(self.benchmarks)
         }
         return summary
     
-    def analyze_all(self) -> Dict:
+    def analyze_all(self, verbose: bool = False) -> Dict:
         """
         Run all benchmark analysis
+        verbose: print a progress line per step (off by default, since the
+                 steps take microseconds and callers log their own progress)
         """
-        print("📊 Analyzing benchmarks...")
+        if verbose:
+            print("📊 Analyzing benchmarks...")
         
         if not self.benchmarks:
             print("✗ No benchmarks loaded")
             return {}
         
         self.compare_overall_metrics()
-        print("✓ Overall metrics compared")
+        if verbose:
+            print("✓ Overall metrics compared")
         
         self.compare_by_channel()
-        print("✓ Channel metrics compared")
+        if verbose:
+            print("✓ Channel metrics compared")
         
         self.generate_benchmark_insights()
-        print("✓ Insights generated")
+        if verbose:
+            print("✓ Insights generated")
         
         self.generate_benchmark_recommendations()
-        print("✓ Recommendations generated")
+        if verbose:
+            print("✓ Recommendations generated")
         
         summary = self.get_summary()
-        print("✓ Benchmarking analysis complete")
+        if verbose:
+            print("✓ Benchmarking analysis complete")
         
         return summary
 
@@ -470,7 +669,7 @@ if __name__ == "__main__":
     analyzer = BenchmarkAnalyzer(kpi_summary, 'industry_benchmarks.json')
     
     # Run analysis
-    bench_summary = analyzer.analyze_all()
+    bench_summary = analyzer.analyze_all(verbose=True)
     
     # Print results
     print("\n" + "="*60)
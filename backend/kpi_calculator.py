@@ -1,8 +1,130 @@
 import pandas as pd
 import numpy as np
+from pandas.api.types import is_datetime64_any_dtype, is_integer_dtype
 from typing import Dict, Tuple, List
 from datetime import datetime, timedelta
 
+try:
+    from numba import get_num_threads, njit, prange
+except ImportError:  # Numba is optional; NumPy/pandas versions are used instead
+    njit = None
+    prange = range
+
+# calculate_by_date switches to the compiled rate kernel from this many days;
+# below it thread start-up costs more than the five pandas passes
+NUMBA_MIN_DAYS = 10_000
+
+# _sum_by switches to the compiled group-sum kernel from this many rows
+NUMBA_MIN_ROWS = 100_000
+
+# Summed per group before the rate KPIs are derived
+AD_METRICS = ['impressions', 'clicks', 'conversions', 'spend', 'revenue']
+NUMERIC_COLS = AD_METRICS + ['visits']
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def _rate(num: pd.Series, den: pd.Series, scale: float = 1) -> pd.Series:
+    """num / den * scale, or 0 where den is not positive"""
+    return (num / den * scale).where(den > 0, 0)
+
+
+def _ad_kpis(sums: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Derive the rate KPIs column-wise from per-group AD_METRICS sums"""
+    grouped = sums[AD_METRICS]
+    
+    grouped['ctr'] = _rate(grouped['clicks'], grouped['impressions'], 100)
+    grouped['cpc'] = _rate(grouped['spend'], grouped['clicks'])
+    grouped['cvr'] = _rate(grouped['conversions'], grouped['clicks'], 100)
+    grouped['cpa'] = _rate(grouped['spend'], grouped['conversions'])
+    grouped['roas'] = _rate(grouped['revenue'], grouped['spend'])
+    grouped.insert(0, key, grouped.index)
+    
+    return grouped
+
+
+def _to_dict(frame: pd.DataFrame) -> Dict[str, Dict]:
+    """Key-indexed aggregation frame as {key: {column: value}}; {} if absent"""
+    return frame.to_dict('index') if frame is not None else {}
+
+
+def _smallest_positions(values: np.ndarray, n: int) -> np.ndarray:
+    """
+    Positions of the n smallest values, ordered like a stable sort (ties by
+    position); argpartition finds the cut-off so only candidates are sorted
+    """
+    if n >= len(values):
+        return np.argsort(values, kind='stable')
+    if n <= 0:
+        return np.empty(0, dtype=np.intp)
+    kth = values[np.argpartition(values, n - 1)[n - 1]]
+    candidates = np.flatnonzero(values <= kth)
+    return candidates[np.argsort(values[candidates], kind='stable')][:n]
+
+
+def _group_sums_loops(codes, data, n_groups, n_chunks):
+    """
+    Per-group column sums of data (rows x columns) for integer group codes
+    Each chunk of rows accumulates into its own partial table, so the
+    parallel chunks never write to the same cell; the partials are added
+    up at the end
+    """
+    n_rows, n_cols = data.shape
+    chunk = (n_rows + n_chunks - 1) // n_chunks
+    partial = np.zeros((n_chunks, n_groups, n_cols))
+    for c in prange(n_chunks):
+        for i in range(c * chunk, min((c + 1) * chunk, n_rows)):
+            g = codes[i]
+            for j in range(n_cols):
+                partial[c, g, j] += data[i, j]
+    
+    out = np.zeros((n_groups, n_cols))
+    for c in range(n_chunks):
+        out += partial[c]
+    return out
+
+
+_group_sums_kernel = None
+if njit is not None:
+    _group_sums_kernel = njit(parallel=True, cache=True)(_group_sums_loops)
+
+
+def _daily_rates_loops(impressions, clicks, conversions, spend, revenue):
+    """
+    ctr, cpc, cvr, cpa and roas per row in one pass, as the columns of an
+    (n, 5) array; 0/0 gives 0 like the fillna(0) pandas version
+    """
+    n = impressions.shape[0]
+    out = np.empty((n, 5))
+    for i in prange(n):
+        out[i, 0] = clicks[i] / impressions[i] * 100
+        out[i, 1] = spend[i] / clicks[i]
+        out[i, 2] = conversions[i] / clicks[i] * 100
+        out[i, 3] = spend[i] / conversions[i]
+        out[i, 4] = revenue[i] / spend[i]
+        for j in range(5):
+            if np.isnan(out[i, j]):
+                out[i, j] = 0.0
+    return out
+
+
+_daily_rates_kernel = None
+if njit is not None:
+    _daily_rates_kernel = njit(parallel=True, cache=True, error_model='numpy')(_daily_rates_loops)
+
+
+def _city_kpis(sums: pd.DataFrame) -> pd.DataFrame:
+    """Derive the visit-based city KPIs from per-city sums"""
+    grouped = sums[['visits', 'conversions', 'spend', 'revenue']]
+    
+    grouped['conversion_rate'] = _rate(grouped['conversions'], grouped['visits'], 100)
+    grouped['revenue_per_visit'] = _rate(grouped['revenue'], grouped['visits'])
+    grouped['roas'] = _rate(grouped['revenue'], grouped['spend'])
+    grouped.insert(0, 'city', grouped.index)
+    
+    return grouped
+
+
 class KPICalculator:
     """
     Step 2: Calculate marketing KPIs from combined data
@@ -15,9 +137,27 @@ class KPICalculator:
         combined_df should have columns: date, campaign, channel, impressions, clicks, 
                     spend, conversions, revenue, visits, rainfall, etc.
         """
-        self.df = combined_df.copy()
+        # Read-only, so no defensive copy; with Copy-on-Write any derived
+        # frame shares the caller's data until it is written to
+        self.df = combined_df
+        
+        # Parse dates once here (the pipeline normally already has); assign
+        # returns a new frame, so the caller's frame is left untouched
+        if 'date' in self.df.columns and not is_datetime64_any_dtype(self.df['date']):
+            self.df = self.df.assign(date=pd.to_datetime(self.df['date'], errors='coerce'))
+        
         self.kpis = {}
         self.aggregations = {}
+        self._numeric_cols = [col for col in NUMERIC_COLS if col in self.df.columns]
+        self._sum_cache = {}
+        
+        # NUMERIC_COLS as one C-contiguous float64 block (missing columns and
+        # NaN as 0) so per-group sums scan rows with unit stride
+        self._nums = np.ascontiguousarray(
+            self.df.reindex(columns=NUMERIC_COLS, fill_value=0).to_numpy(dtype=np.float64, na_value=0.0))
+        # Count columns are summed as float64 and cast back for the results
+        self._sum_dtypes = {col: np.int64 for col in NUMERIC_COLS
+                            if col not in self.df.columns or is_integer_dtype(self.df[col])}
         
     def calculate_basic_kpis(self) -> Dict:
         """
@@ -40,13 +180,11 @@ class KPICalculator:
             'avg_daily_conversions': 0,
         }
         
-        # Calculate totals
-        kpis['total_impressions'] = self.df['impressions'].sum()
-        kpis['total_clicks'] = self.df['clicks'].sum()
-        kpis['total_conversions'] = self.df['conversions'].sum()
-        kpis['total_spend'] = self.df['spend'].sum()
-        kpis['total_revenue'] = self.df['revenue'].sum()
-        kpis['total_visits'] = self.df['visits'].sum() if 'visits' in self.df.columns else 0
+        # Calculate totals in one pass over the numeric columns; the mixed
+        # frame sums to float64, so count totals are cast back to integers
+        totals = self.df[self._numeric_cols].sum().reindex(NUMERIC_COLS, fill_value=0)
+        for col, total in totals.items():
+            kpis[f'total_{col}'] = self._sum_dtypes.get(col, np.float64)(total)
         
         # Calculate rates (avoid division by zero)
         if kpis['total_impressions'] > 0:
@@ -64,8 +202,8 @@ class KPICalculator:
         if kpis['total_spend'] > 0:
             kpis['roas'] = kpis['total_revenue'] / kpis['total_spend']
         
-        # Calculate daily averages
-        num_days = len(self.df)
+        # Calculate daily averages over distinct dates, not rows
+        num_days = int(self.df['date'].nunique()) if 'date' in self.df.columns else len(self.df)
         if num_days > 0:
             kpis['avg_daily_impressions'] = kpis['total_impressions'] / num_days
             kpis['avg_daily_clicks'] = kpis['total_clicks'] / num_days
@@ -74,76 +212,49 @@ class KPICalculator:
         self.kpis['overall'] = kpis
         return kpis
     
-    def calculate_by_channel(self) -> Dict[str, Dict]:
+    def _sum_by(self, key: str, values: pd.Series = None) -> pd.DataFrame:
+        """
+        Per-group sums of NUMERIC_COLS (missing columns as 0) plus a 'rows'
+        count, memoized so each key is only factorized once
+        values: optional row-aligned keys to group on instead of column key
+        """
+        if key not in self._sum_cache:
+            codes, uniques = pd.factorize(self.df[key] if values is None else values,
+                                          sort=False, use_na_sentinel=False)
+            if _group_sums_kernel is not None and len(codes) >= NUMBA_MIN_ROWS:
+                totals = _group_sums_kernel(codes, self._nums, len(uniques), get_num_threads())
+            else:
+                totals = np.column_stack([np.bincount(codes, weights=col, minlength=len(uniques))
+                                          for col in self._nums.T])
+            
+            sums = pd.DataFrame(totals, index=pd.Index(uniques), columns=NUMERIC_COLS)
+            sums = sums.astype(self._sum_dtypes)
+            sums['rows'] = np.bincount(codes, minlength=len(uniques))
+            self._sum_cache[key] = sums
+        return self._sum_cache[key]
+    
+    def calculate_by_channel(self) -> pd.DataFrame:
         """
         Calculate KPIs grouped by channel (email, social, organic, etc.)
+        One row per channel, indexed by channel
         """
         if 'channel' not in self.df.columns:
-            return {}
-        
-        channel_kpis = {}
+            return pd.DataFrame()
         
-        for channel in self.df['channel'].unique():
-            channel_df = self.df[self.df['channel'] == channel]
-            
-            total_impressions = channel_df['impressions'].sum()
-            total_clicks = channel_df['clicks'].sum()
-            total_conversions = channel_df['conversions'].sum()
-            total_spend = channel_df['spend'].sum()
-            total_revenue = channel_df['revenue'].sum()
-            
-            kpi = {
-                'channel': channel,
-                'impressions': total_impressions,
-                'clicks': total_clicks,
-                'conversions': total_conversions,
-                'spend': total_spend,
-                'revenue': total_revenue,
-                'ctr': (total_clicks / total_impressions * 100) if total_impressions > 0 else 0,
-                'cpc': (total_spend / total_clicks) if total_clicks > 0 else 0,
-                'cvr': (total_conversions / total_clicks * 100) if total_clicks > 0 else 0,
-                'cpa': (total_spend / total_conversions) if total_conversions > 0 else 0,
-                'roas': (total_revenue / total_spend) if total_spend > 0 else 0,
-            }
-            
-            channel_kpis[channel] = kpi
+        channel_kpis = _ad_kpis(self._sum_by('channel'), 'channel')
         
         self.aggregations['by_channel'] = channel_kpis
         return channel_kpis
     
-    def calculate_by_campaign(self) -> Dict[str, Dict]:
+    def calculate_by_campaign(self) -> pd.DataFrame:
         """
         Calculate KPIs grouped by campaign
+        One row per campaign, indexed by campaign
         """
         if 'campaign' not in self.df.columns:
-            return {}
-        
-        campaign_kpis = {}
+            return pd.DataFrame()
         
-        for campaign in self.df['campaign'].unique():
-            campaign_df = self.df[self.df['campaign'] == campaign]
-            
-            total_impressions = campaign_df['impressions'].sum()
-            total_clicks = campaign_df['clicks'].sum()
-            total_conversions = campaign_df['conversions'].sum()
-            total_spend = campaign_df['spend'].sum()
-            total_revenue = campaign_df['revenue'].sum()
-            
-            kpi = {
-                'campaign': campaign,
-                'impressions': total_impressions,
-                'clicks': total_clicks,
-                'conversions': total_conversions,
-                'spend': total_spend,
-                'revenue': total_revenue,
-                'ctr': (total_clicks / total_impressions * 100) if total_impressions > 0 else 0,
-                'cpc': (total_spend / total_clicks) if total_clicks > 0 else 0,
-                'cvr': (total_conversions / total_clicks * 100) if total_clicks > 0 else 0,
-                'cpa': (total_spend / total_conversions) if total_conversions > 0 else 0,
-                'roas': (total_revenue / total_spend) if total_spend > 0 else 0,
-            }
-            
-            campaign_kpis[campaign] = kpi
+        campaign_kpis = _ad_kpis(self._sum_by('campaign'), 'campaign')
         
         self.aggregations['by_campaign'] = campaign_kpis
         return campaign_kpis
@@ -155,145 +266,99 @@ class KPICalculator:
         if 'date' not in self.df.columns:
             return pd.DataFrame()
         
-        daily_kpis = self.df.groupby('date').agg({
-            'impressions': 'sum',
-            'clicks': 'sum',
-            'conversions': 'sum',
-            'spend': 'sum',
-            'revenue': 'sum',
-            'visits': 'sum' if 'visits' in self.df.columns else lambda x: 0
-        }).reset_index()
+        daily_kpis = self._sum_by('date')[NUMERIC_COLS].sort_index()
+        daily_kpis = daily_kpis[daily_kpis.index.notna()].rename_axis('date').reset_index()
         
         # Calculate daily rates
-        daily_kpis['ctr'] = (daily_kpis['clicks'] / daily_kpis['impressions'] * 100).fillna(0)
-        daily_kpis['cpc'] = (daily_kpis['spend'] / daily_kpis['clicks']).fillna(0)
-        daily_kpis['cvr'] = (daily_kpis['conversions'] / daily_kpis['clicks'] * 100).fillna(0)
-        daily_kpis['cpa'] = (daily_kpis['spend'] / daily_kpis['conversions']).fillna(0)
-        daily_kpis['roas'] = (daily_kpis['revenue'] / daily_kpis['spend']).fillna(0)
+        if _daily_rates_kernel is not None and len(daily_kpis) >= NUMBA_MIN_DAYS:
+            columns = [daily_kpis[col].to_numpy(dtype=np.float64) for col in AD_METRICS]
+            daily_kpis[['ctr', 'cpc', 'cvr', 'cpa', 'roas']] = _daily_rates_kernel(*columns)
+        else:
+            daily_kpis['ctr'] = (daily_kpis['clicks'] / daily_kpis['impressions'] * 100).fillna(0)
+            daily_kpis['cpc'] = (daily_kpis['spend'] / daily_kpis['clicks']).fillna(0)
+            daily_kpis['cvr'] = (daily_kpis['conversions'] / daily_kpis['clicks'] * 100).fillna(0)
+            daily_kpis['cpa'] = (daily_kpis['spend'] / daily_kpis['conversions']).fillna(0)
+            daily_kpis['roas'] = (daily_kpis['revenue'] / daily_kpis['spend']).fillna(0)
         
         self.aggregations['by_date'] = daily_kpis
         return daily_kpis
     
-    def calculate_by_city(self) -> Dict[str, Dict]:
+    def calculate_by_city(self) -> pd.DataFrame:
         """
         Calculate KPIs grouped by city (if available)
+        One row per city, indexed by city
         """
         if 'city' not in self.df.columns:
-            return {}
-        
-        city_kpis = {}
+            return pd.DataFrame()
         
-        for city in self.df['city'].unique():
-            city_df = self.df[self.df['city'] == city]
-            
-            total_visits = city_df['visits'].sum() if 'visits' in city_df.columns else 0
-            total_conversions = city_df['conversions'].sum()
-            total_spend = city_df['spend'].sum()
-            total_revenue = city_df['revenue'].sum()
-            
-            kpi = {
-                'city': city,
-                'visits': total_visits,
-                'conversions': total_conversions,
-                'spend': total_spend,
-                'revenue': total_revenue,
-                'conversion_rate': (total_conversions / total_visits * 100) if total_visits > 0 else 0,
-                'revenue_per_visit': (total_revenue / total_visits) if total_visits > 0 else 0,
-                'roas': (total_revenue / total_spend) if total_spend > 0 else 0,
-            }
-            
-            city_kpis[city] = kpi
+        city_kpis = _city_kpis(self._sum_by('city'))
         
         self.aggregations['by_city'] = city_kpis
         return city_kpis
     
+    def _rank_campaigns(self, metric: str, n: int, ascending: bool) -> List[Dict]:
+        """First n campaign KPI dicts ordered by metric, ties kept in campaign order"""
+        if 'by_campaign' not in self.aggregations:
+            self.calculate_by_campaign()
+        
+        campaigns = self.aggregations.get('by_campaign', pd.DataFrame())
+        if metric not in campaigns.columns:
+            return campaigns.iloc[:n].to_dict('records')
+        
+        values = campaigns[metric].to_numpy(dtype=np.float64)
+        order = _smallest_positions(values if ascending else -values, n)
+        return campaigns.iloc[order].to_dict('records')
+    
     def get_top_performers(self, metric: str = 'roas', n: int = 5) -> List[Dict]:
         """
         Get top N campaigns/channels by a specific metric
         metric: 'roas', 'ctr', 'cpa', 'revenue', etc.
         """
-        if 'by_campaign' not in self.aggregations:
-            self.calculate_by_campaign()
-        
-        campaigns = list(self.aggregations['by_campaign'].values())
-        
-        # Sort by metric (descending for positive metrics, ascending for cost metrics)
-        if metric.startswith('c'):  # Cost metrics (CPC, CPA, etc.)
-            sorted_campaigns = sorted(campaigns, key=lambda x: x.get(metric, float('inf')))
-        else:  # Performance metrics (ROAS, CTR, CVR, etc.)
-            sorted_campaigns = sorted(campaigns, key=lambda x: x.get(metric, 0), reverse=True)
-        
-        return sorted_campaigns[:n]
+        # Ascending for cost metrics (CPC, CPA, etc.), descending for performance metrics
+        return self._rank_campaigns(metric, n, ascending=metric.startswith('c'))
     
     def get_worst_performers(self, metric: str = 'roas', n: int = 5) -> List[Dict]:
         """
         Get bottom N campaigns/channels by a specific metric
         """
-        if 'by_campaign' not in self.aggregations:
-            self.calculate_by_campaign()
-        
-        campaigns = list(self.aggregations['by_campaign'].values())
-        
-        # Sort by metric (ascending for positive metrics, descending for cost metrics)
-        if metric.startswith('c'):  # Cost metrics
-            sorted_campaigns = sorted(campaigns, key=lambda x: x.get(metric, 0), reverse=True)
-        else:  # Performance metrics
-            sorted_campaigns = sorted(campaigns, key=lambda x: x.get(metric, float('inf')))
-        
-        return sorted_campaigns[:n]
+        # Descending for cost metrics, ascending for performance metrics
+        return self._rank_campaigns(metric, n, ascending=not metric.startswith('c'))
     
-    def get_day_of_week_analysis(self) -> Dict:
+    def get_day_of_week_analysis(self) -> pd.DataFrame:
         """
         Analyze performance by day of week
+        One row per weekday present, Monday first, indexed by day name
         """
         if 'date' not in self.df.columns:
-            return {}
-        
-        self.df['date'] = pd.to_datetime(self.df['date'])
-        self.df['day_of_week'] = self.df['date'].dt.day_name()
-        
-        dow_analysis = {}
-        
-        for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']:
-            day_df = self.df[self.df['day_of_week'] == day]
-            
-            if len(day_df) == 0:
-                continue
-            
-            total_impressions = day_df['impressions'].sum()
-            total_clicks = day_df['clicks'].sum()
-            total_conversions = day_df['conversions'].sum()
-            total_spend = day_df['spend'].sum()
-            total_revenue = day_df['revenue'].sum()
-            
-            kpi = {
-                'day': day,
-                'impressions': total_impressions,
-                'clicks': total_clicks,
-                'conversions': total_conversions,
-                'spend': total_spend,
-                'revenue': total_revenue,
-                'ctr': (total_clicks / total_impressions * 100) if total_impressions > 0 else 0,
-                'cpa': (total_spend / total_conversions) if total_conversions > 0 else 0,
-                'roas': (total_revenue / total_spend) if total_spend > 0 else 0,
-                'avg_spend': total_spend / len(day_df) if len(day_df) > 0 else 0,
-            }
-            
-            dow_analysis[day] = kpi
+            return pd.DataFrame()
         
-        self.aggregations['by_day_of_week'] = dow_analysis
-        return dow_analysis
+        # Group on the 0-6 weekday codes and only name the seven result rows
+        days = self._sum_by('day_of_week', self.df['date'].dt.dayofweek)
+        days = days.reindex(range(len(DAY_NAMES)), fill_value=0).set_axis(DAY_NAMES)
+        days = days[days['rows'] > 0]
+        rows = days['rows']
+        days = days[AD_METRICS]
+        
+        days['ctr'] = _rate(days['clicks'], days['impressions'], 100)
+        days['cpa'] = _rate(days['spend'], days['conversions'])
+        days['roas'] = _rate(days['revenue'], days['spend'])
+        days['avg_spend'] = days['spend'] / rows
+        days.insert(0, 'day', days.index)
+        
+        self.aggregations['by_day_of_week'] = days
+        return days
     
     def generate_kpi_summary(self) -> Dict:
         """
         Generate a comprehensive summary of all KPIs for reporting
+        The aggregation frames become plain dicts here, at the JSON boundary
         """
         summary = {
             'overall': self.kpis.get('overall', {}),
-            'by_channel': self.aggregations.get('by_channel', {}),
-            'by_campaign': self.aggregations.get('by_campaign', {}),
-            'by_city': self.aggregations.get('by_city', {}),
-            'by_day_of_week': self.aggregations.get('by_day_of_week', {}),
+            'by_channel': _to_dict(self.aggregations.get('by_channel')),
+            'by_campaign': _to_dict(self.aggregations.get('by_campaign')),
+            'by_city': _to_dict(self.aggregations.get('by_city')),
+            'by_day_of_week': _to_dict(self.aggregations.get('by_day_of_week')),
             'top_campaigns': self.get_top_performers('roas', 5),
             'worst_campaigns': self.get_worst_performers('roas', 5),
             'daily_trend': self.aggregations.get('by_date', {}).to_dict('records') if isinstance(self.aggregations.get('by_date'), pd.DataFrame) else []
@@ -336,9 +401,9 @@ class KPICalculator:
 # =====================
 
 if __name__ == "__main__":
-    # Assume combined_df comes from Step 1 (pipeline.py)
-    # Load combined data
-    combined_df = pd.read_csv('combined_data.csv')
+    # combined_df comes straight from Step 1 (pipeline.py), no CSV round-trip
+    from pipeline import DataPipeline
+    combined_df = DataPipeline({'combined_data.csv': 'combined_data.csv'}).merge_all_data()
     
     # Initialize calculator
     calculator = KPICalculator(combined_df)
@@ -1,7 +1,53 @@
 import pandas as pd
 import os
+from concurrent.futures import ThreadPoolExecutor
+from pandas.api.types import is_datetime64_any_dtype
 from typing import List, Dict, Tuple
 
+# pyarrow's multithreaded CSV reader is much faster than the default C parser;
+# fall back to the C engine when pyarrow isn't installed
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    CSV_ENGINE = 'c'
+
+# Copy-on-Write is always on from pandas 3; opt in on older versions so the
+# analyzers can share the combined frame without defensive copies
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.options.mode.copy_on_write = True
+
+# Declared dtypes for known metric columns (matched case-insensitively) so the
+# parser skips type inference (load_csv falls back to coercing them when a
+# file has non-numeric cells). Money stays float64 since KPI totals are
+# reported to the cent; weather readings have one decimal and fit in float32.
+COLUMN_DTYPES = {
+    'spend': 'float64',
+    'revenue': 'float64',
+    'planned_spend': 'float64',
+    'actual_spend': 'float64',
+    'lifetime_value': 'float64',
+    'temperature_c': 'float32',
+    'rainfall_mm': 'float32',
+}
+
+# Count columns are parsed as float64 so blank cells load as NaN in the same
+# pass; load_csv casts blank-free count columns back to int64 and clean_data
+# downcasts them further
+COUNT_DTYPES = {
+    'impressions': 'float64',
+    'clicks': 'float64',
+    'conversions': 'float64',
+    'visits': 'float64',
+}
+
+# Columns parsed as dates while loading (matched case-insensitively)
+DATE_COLUMNS = ['date']
+
+# Low-cardinality key columns the analyzers group on; stored as categoricals
+# so each groupby reuses the integer codes instead of hashing strings
+CATEGORICAL_COLS = ['channel', 'campaign', 'city']
+
 class DataPipeline:
     """
     Step 1: Load and combine multiple CSV files into standardized format
@@ -17,10 +63,37 @@ class DataPipeline:
         self.dataframes = {}
         self.combined_df = None
     
-    def load_csv(self, file_path: str) -> pd.DataFrame:
-        """Load a single CSV file"""
+    def _column_dtypes(self, header: pd.Index, dtypes: Dict[str, str]) -> Dict[str, str]:
+        """Map the file's header names onto a lowercase-keyed dtype table"""
+        return {col: dtypes[col.lower()] for col in header if col.lower() in dtypes}
+    
+    def load_csv(self, file_path: str, parse_dates: List[str] = DATE_COLUMNS) -> pd.DataFrame:
+        """Load a single CSV file, parsing the parse_dates columns"""
         try:
-            df = pd.read_csv(file_path)
+            header = pd.read_csv(file_path, nrows=0).columns
+            options = {'engine': CSV_ENGINE}
+            
+            # pyarrow can't parse day-first dates; merge_all_data converts them instead
+            date_cols = [col for col in header if col.lower() in parse_dates]
+            if date_cols and CSV_ENGINE == 'c':
+                options.update(parse_dates=date_cols, date_format='mixed', dayfirst=True)
+            
+            dtypes = self._column_dtypes(header, {**COLUMN_DTYPES, **COUNT_DTYPES})
+            try:
+                df = pd.read_csv(file_path, **options, dtype=dtypes)
+            except ValueError:
+                # A stray token ('$6', 'N/A') in a declared column fails the typed
+                # parse; re-read untyped and coerce those cells to NaN instead of
+                # dropping the whole file
+                df = pd.read_csv(file_path, **options)
+                for col, dtype in dtypes.items():
+                    df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+            
+            # Whole-number counts without blanks go back to int64 (an in-memory
+            # cast, not a re-parse); the rest stay float64 with NaN
+            for col in self._column_dtypes(header, COUNT_DTYPES):
+                if not df[col].hasnans and (df[col] % 1 == 0).all():
+                    df[col] = df[col].astype('int64')
             print(f"✓ Loaded {file_path}: {len(df)} rows, {len(df.columns)} columns")
             return df
         except Exception as e:
@@ -29,8 +102,12 @@ class DataPipeline:
     
     def load_multiple_csvs(self, file_paths: Dict[str, str]) -> Dict[str, pd.DataFrame]:
         """Load multiple CSV files from upload_paths dict"""
-        for name, file_path in file_paths.items():
-            df = self.load_csv(file_path)
+        # The parsers release the GIL, so files load in parallel threads;
+        # map keeps the upload order
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(file_paths)))) as executor:
+            loaded = list(executor.map(self.load_csv, file_paths.values()))
+        
+        for name, df in zip(file_paths, loaded):
             if df is not None:
                 self.dataframes[name] = df
         
@@ -48,18 +125,23 @@ class DataPipeline:
             raise ValueError("No CSV files loaded successfully")
         
         # Use first CSV file (works with any name)
-        self.combined_df = list(self.dataframes.values())[0]
+        self.combined_df = next(iter(self.dataframes.values()))
         
         self.combined_df.columns = self.combined_df.columns.str.lower()
         
-        # Ensure date column is datetime if it exists
-        if 'date' in self.combined_df.columns:
-          self.combined_df['date'] = pd.to_datetime(
-          self.combined_df['date'], 
-          format='mixed', 
-          dayfirst=True,
-          errors='coerce'
-    )
+        for col in CATEGORICAL_COLS:
+            if col in self.combined_df.columns:
+                self.combined_df[col] = self.combined_df[col].astype('category')
+        
+        # load_csv already parsed the dates; this only catches columns with
+        # unparseable values (left as strings) or an engine that couldn't parse
+        if 'date' in self.combined_df.columns and not is_datetime64_any_dtype(self.combined_df['date']):
+            self.combined_df['date'] = pd.to_datetime(
+                self.combined_df['date'],
+                format='mixed',
+                dayfirst=True,
+                errors='coerce'
+            )
         
         print(f"\n✓ Combined dataframe: {len(self.combined_df)} rows")
         print(f"✓ Columns: {list(self.combined_df.columns)}")
@@ -87,18 +169,25 @@ class DataPipeline:
         Clean and prepare data:
         - Convert date to datetime
         - Fill NaN with 0 for numeric columns
+        - Downcast count columns to the smallest integer type
         - Remove completely empty rows
         """
-        # Find date columns and convert
+        # Convert date columns that weren't already parsed on load
         date_cols = ['date', 'Date', 'DATE']
         for col in date_cols:
-            if col in df.columns:
+            if col in df.columns and not is_datetime64_any_dtype(df[col]):
                 df[col] = pd.to_datetime(df[col], errors='coerce')
         
         # Fill NaN in numeric columns with 0
         numeric_cols = df.select_dtypes(include=['number']).columns
         df[numeric_cols] = df[numeric_cols].fillna(0)
         
+        # Counts rarely need int64; narrower columns halve the bytes the sums
+        # stream through. Money stays float64 (see COLUMN_DTYPES)
+        for col in df.columns:
+            if col.lower() in COUNT_DTYPES:
+                df[col] = pd.to_numeric(df[col], downcast='integer')
+        
         # Remove rows where all values are NaN
         df = df.dropna(how='all')
         
@@ -107,26 +196,27 @@ class DataPipeline:
     def combine_dataframes(self, join_key: str = 'date') -> pd.DataFrame:
         """
         Merge all dataframes on a common key (usually 'date')
+        Every file must have the key; overlapping columns get merge's _x/_y
+        suffixes, so the result never has duplicate column names
         """
         if not self.dataframes:
             print("✗ No dataframes to combine")
             return None
         
-        dfs_list = list(self.dataframes.values())
+        # Check the schema up front instead of side-by-side concatenating
+        # files that can't be aligned row-for-row
+        missing = [name for name, df in self.dataframes.items() if join_key not in df.columns]
+        if missing:
+            raise ValueError(f"Cannot combine on '{join_key}': missing from {', '.join(missing)}")
+        
+        frames = iter(self.dataframes.values())
         
         # Start with first dataframe
-        combined = dfs_list[0].copy()
+        combined = next(frames)
         
         # Left join all subsequent dataframes
-        for df in dfs_list[1:]:
-            if join_key in df.columns and join_key in combined.columns:
-                combined = combined.merge(df, on=join_key, how='left')
-            else:
-                # If no common key, just concatenate
-                combined = pd.concat([combined, df], axis=1)
-        
-        # Remove duplicate columns
-        combined = combined.loc[:, ~combined.columns.duplicated()]
+        for df in frames:
+            combined = combined.merge(df, on=join_key, how='left')
         
         self.combined_df = combined
         print(f"✓ Combined dataset: {len(combined)} rows, {len(combined.columns)} columns")
@@ -140,13 +230,25 @@ class DataPipeline:
         if self.combined_df is None:
             return None
         
+        # Direct reductions instead of describe(), which also sorts every
+        # column for its quartiles. Still keyed {column: {stat: value}}, but
+        # the stats are now count/mean/min/max/sum: describe()'s std and
+        # 25%/50%/75% quartiles are no longer reported
+        numeric = self.combined_df.select_dtypes('number')
+        
         summary = {
             'total_rows': len(self.combined_df),
             'total_columns': len(self.combined_df.columns),
             'columns': list(self.combined_df.columns),
             'dtypes': self.combined_df.dtypes.to_dict(),
             'missing_values': self.combined_df.isnull().sum().to_dict(),
-            'numeric_summary': self.combined_df.describe().to_dict()
+            'numeric_summary': pd.DataFrame({
+                'count': numeric.count(),
+                'mean': numeric.mean(),
+                'min': numeric.min(),
+                'max': numeric.max(),
+                'sum': numeric.sum(),
+            }).to_dict('index')
         }
         
         return summary
@@ -163,3 +265,18 @@ class DataPipeline:
         print(f"✓ Saved combined data to {output_path}")
         
         return output_path
+    
+    def save_combined_parquet(self, output_path: str = 'combined_data.parquet') -> str:
+        """
+        Save combined dataframe to snappy-compressed Parquet (needs pyarrow)
+        Smaller and faster to reload than CSV, and keeps the parsed dtypes;
+        in-process callers should pass combined_df on directly instead
+        """
+        if self.combined_df is None:
+            print("✗ No combined data to save")
+            return None
+        
+        self.combined_df.to_parquet(output_path, compression='snappy', index=False)
+        print(f"✓ Saved combined data to {output_path}")
+        
+        return output_path
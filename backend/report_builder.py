@@ -1,56 +1,120 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
 
-class ReportBuilder:
-    """
-    Step 7: Build comprehensive PDF report from all analytics
-    Combines KPI summary, weather insights, anomalies, benchmarks, and forecast
-    """
-    
-    def __init__(self, client_name: str = "Client"):
-        self.client_name = client_name
-        self.generated_time = datetime.now().strftime("%B %d, %Y at %I:%M %p")
-        self.story = []
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
-    
-    def _setup_custom_styles(self):
-        """Setup custom paragraph styles"""
-        self.styles.add(ParagraphStyle(
+# ReportLab is imported where it is used rather than here, so importing this
+# module (the API server does at start-up) doesn't pay for it until a report
+# is actually built; later imports are sys.modules lookups
+
+# KPI table row heights: one line at the table's default 12pt leading plus
+# cell padding (3pt, or 12pt below the header). Passing them explicitly lets
+# Table skip measuring every cell to size the rows
+KPI_HEADER_HEIGHT = 12 + 3 + 12
+KPI_ROW_HEIGHT = 12 + 3 + 3
+
+# KPI table value columns and the unit text around each formatted value
+KPI_TABLE_COLUMNS = ['ctr', 'cpc', 'cvr', 'cpa', 'roas']
+KPI_CELL_PREFIXES = np.array(['', '$', '', '$', ''])
+KPI_CELL_SUFFIXES = np.array(['%', '', '%', '', 'x'])
+
+# Write buffer for the output PDF, so the document streams to disk in
+# large chunks instead of being copied whole at save time
+PDF_WRITE_BUFFER = 1 << 20
+
+# Identical for every report; Table.setStyle only reads the commands, so
+# one instance, built on first use, is shared instead of being rebuilt per table
+_KPI_TABLE_STYLE = None
+
+# Sample stylesheet plus the custom report styles, built on first use and
+# shared by every ReportBuilder (the style objects are never modified)
+_BASE_STYLES = None
+
+
+def _kpi_table_style() -> 'TableStyle':
+    """Return the shared KPI table style, building it the first time"""
+    global _KPI_TABLE_STYLE
+    if _KPI_TABLE_STYLE is None:
+        from reportlab.lib import colors
+        from reportlab.platypus import TableStyle
+        
+        _KPI_TABLE_STYLE = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2D7A8F')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ])
+    return _KPI_TABLE_STYLE
+
+
+def _base_styles() -> 'StyleSheet1':
+    """Return the shared stylesheet, building it the first time"""
+    global _BASE_STYLES
+    if _BASE_STYLES is None:
+        from reportlab.lib import colors
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        
+        styles = getSampleStyleSheet()
+        
+        styles.add(ParagraphStyle(
             name='CustomHeading1',
-            parent=self.styles['Heading1'],
+            parent=styles['Heading1'],
             fontSize=24,
             textColor=colors.HexColor('#1B3A47'),
             spaceAfter=12,
             fontName='Helvetica-Bold'
         ))
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='CustomHeading2',
-            parent=self.styles['Heading2'],
+            parent=styles['Heading2'],
             fontSize=14,
             textColor=colors.HexColor('#2D7A8F'),
             spaceAfter=8,
             fontName='Helvetica-Bold'
         ))
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='CustomBody',
-            parent=self.styles['BodyText'],
+            parent=styles['BodyText'],
             fontSize=10,
             leading=14,
             textColor=colors.HexColor('#333333')
         ))
+        
+        _BASE_STYLES = styles
+    return _BASE_STYLES
+
+
+class ReportBuilder:
+    """
+    Step 7: Build comprehensive PDF report from all analytics
+    Combines KPI summary, weather insights, anomalies, benchmarks, and forecast
+    """
+    
+    def __init__(self, client_name: str = "Client"):
+        from reportlab.lib.styles import StyleSheet1
+        
+        self.client_name = client_name
+        self.generated_time = datetime.now().strftime("%B %d, %Y at %I:%M %p")
+        self.story = []
+        
+        # Own name/alias maps over the shared style objects, so styles added
+        # to one builder don't leak into the others
+        base = _base_styles()
+        self.styles = StyleSheet1()
+        self.styles.byName = dict(base.byName)
+        self.styles.byAlias = dict(base.byAlias)
     
     def add_cover_page(self):
         """Add title/cover page"""
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Spacer, PageBreak
+        
         self.story.append(Spacer(1, 2*inch))
         
         title = Paragraph(
@@ -84,6 +148,9 @@ class ReportBuilder:
     
     def add_kpi_table(self, kpi_summary: dict):
         """Add KPI summary table"""
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Spacer, Table
+        
         self.story.append(Paragraph(
             "Performance Metrics by Channel",
             self.styles['CustomHeading2']
@@ -96,35 +163,28 @@ class ReportBuilder:
             ['Channel', 'CTR', 'CPC', 'CVR', 'CPA', 'ROAS']
         ]
         
-        for channel, metrics in by_channel.items():
-            table_data.append([
-                channel.capitalize(),
-                f"{metrics.get('ctr', 0):.2f}%",
-                f"${metrics.get('cpc', 0):.2f}",
-                f"{metrics.get('cvr', 0):.2f}%",
-                f"${metrics.get('cpa', 0):.2f}",
-                f"{metrics.get('roas', 0):.2f}x"
-            ])
+        if by_channel:
+            # Format every cell at once; missing metrics show as 0
+            kpis = (pd.DataFrame.from_dict(by_channel, orient='index')
+                    .reindex(columns=KPI_TABLE_COLUMNS).fillna(0))
+            cells = np.char.mod('%.2f', kpis.to_numpy(dtype=np.float64))
+            cells = np.char.add(np.char.add(KPI_CELL_PREFIXES, cells), KPI_CELL_SUFFIXES)
+            channels = [str(channel).capitalize() for channel in kpis.index]
+            table_data += [[channel, *row] for channel, row in zip(channels, cells.tolist())]
         
         # Create table
-        table = Table(table_data, colWidths=[1.2*inch]*6)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2D7A8F')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ]))
+        table = Table(table_data, colWidths=[1.2*inch]*6,
+                      rowHeights=[KPI_HEADER_HEIGHT] + [KPI_ROW_HEIGHT] * (len(table_data) - 1))
+        table.setStyle(_kpi_table_style())
         
         self.story.append(table)
         self.story.append(Spacer(1, 0.3*inch))
     
     def add_weather_insights(self, weather_summary: dict):
         """Add weather analysis section"""
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Spacer
+        
         if not weather_summary or not weather_summary.get('insights'):
             return
         
@@ -150,6 +210,9 @@ class ReportBuilder:
     
     def add_anomalies(self, anomaly_summary: dict):
         """Add anomaly detection section"""
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Spacer
+        
         if not anomaly_summary or anomaly_summary.get('total_anomalies', 0) == 0:
             self.story.append(Paragraph(
                 "🚨 Anomaly Detection",
@@ -188,6 +251,9 @@ class ReportBuilder:
     
     def add_benchmarking(self, bench_summary: dict):
         """Add benchmarking section"""
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Spacer
+        
         if not bench_summary or not bench_summary.get('benchmarks_loaded'):
             return
         
@@ -222,6 +288,9 @@ class ReportBuilder:
     def add_recommendations(self, kpi_summary: dict, weather_summary: dict, 
                           anomaly_summary: dict, bench_summary: dict):
         """Add recommendations section"""
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Spacer, PageBreak
+        
         self.story.append(PageBreak())
         self.story.append(Paragraph(
             "🎯 Recommendations & Action Items",
@@ -252,9 +321,16 @@ class ReportBuilder:
         
         self.story.append(Spacer(1, 0.3*inch))
     
-    def generate_pdf(self, filepath: str, kpi_summary: dict, weather_summary: dict = None,
+    def generate_pdf(self, filepath, kpi_summary: dict, weather_summary: dict = None,
                     anomaly_summary: dict = None, bench_summary: dict = None):
-        """Generate complete PDF report"""
+        """
+        Generate complete PDF report
+        filepath: output path, or a writable binary file object (e.g. BytesIO
+                  for batch workers that keep reports in memory)
+        """
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate
+        
         self.story = []
         
         self.add_cover_page()
@@ -273,8 +349,11 @@ class ReportBuilder:
                                 anomaly_summary or {}, bench_summary or {})
         
         # Create PDF
-        doc = SimpleDocTemplate(filepath, pagesize=letter)
-        doc.build(self.story)
+        if hasattr(filepath, 'write'):
+            SimpleDocTemplate(filepath, pagesize=letter).build(self.story)
+        else:
+            with open(filepath, 'wb', buffering=PDF_WRITE_BUFFER) as pdf_file:
+                SimpleDocTemplate(pdf_file, pagesize=letter).build(self.story)
         
-        print(f"✓ PDF report generated: {filepath}")
+        print(f"✓ PDF report generated: {getattr(filepath, 'name', filepath)}")
         return filepath
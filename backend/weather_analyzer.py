@@ -1,7 +1,121 @@
 import pandas as pd
 import numpy as np
+from pandas.api.types import is_datetime64_any_dtype
 from typing import Dict, List, Tuple
-from scipy import stats
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; the NumPy kernel is used instead
+    njit = None
+
+WEATHER_COLS = ['temperature_c', 'rainfall_mm']
+
+# Temperature ranges as [lower, upper) bin edges in °C and their names
+TEMP_BINS = [0, 10, 15, 20, 25, 50]
+TEMP_LABELS = ['cold', 'cool', 'mild', 'warm', 'hot']
+
+# Weather and performance columns read as float64 arrays by the analyses
+ARRAY_COLS = ['temperature_c', 'rainfall_mm', 'conversions', 'revenue', 'visits', 'clicks', 'impressions']
+
+
+def _pearson_p_values(r: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """
+    Two-sided p-values for Pearson r over n points (same test as pearsonr)
+    via the Student-t tail with n - 2 degrees of freedom; NaN where r is
+    NaN or n < 3
+    r must already be clipped to [-1, 1]; |r| = 1 gives p = 0
+    """
+    from scipy.special import stdtr  # only needed once correlations are requested
+    
+    r, n = np.broadcast_arrays(np.asarray(r, dtype=np.float64), np.asarray(n, dtype=np.float64))
+    p_values = np.full(r.shape, np.nan)
+    valid = (n > 2) & ~np.isnan(r)
+    
+    df = n[valid] - 2
+    with np.errstate(divide='ignore'):
+        t = np.abs(r[valid]) * np.sqrt(df / ((1 - r[valid]) * (1 + r[valid])))
+    p_values[valid] = 2 * stdtr(df, -t)
+    
+    return p_values
+
+
+def _nanmean(values: np.ndarray) -> float:
+    """Mean ignoring NaN like Series.mean(); NaN when no value is left"""
+    valid = values[~np.isnan(values)]
+    return valid.mean() if len(valid) else np.nan
+
+
+def _pearson(x: np.ndarray, y: np.ndarray) -> float:
+    """Pearson r of x and y (no NaN); NaN when either side is constant"""
+    dx = x - x.mean()
+    dy = y - y.mean()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (dx @ dy) / np.sqrt((dx @ dx) * (dy @ dy))
+
+
+def _channel_pearson_numpy(codes: np.ndarray, values: np.ndarray, n_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-group Pearson r of temperature and rainfall against conversions
+    values columns: conversions, temperature_c, rainfall_mm (no NaN); codes
+    are group ids in [0, n_groups). Returns (row counts, r as (n_groups, 2)),
+    with NaN r for empty groups or constant columns
+    """
+    counts = np.bincount(codes, minlength=n_groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.column_stack([np.bincount(codes, weights=values[:, j], minlength=n_groups)
+                                 for j in range(3)]) / counts[:, None]
+        centered = values - means[codes]
+        dy = centered[:, 0]
+        syy = np.bincount(codes, weights=dy * dy, minlength=n_groups)
+        r = np.column_stack([
+            np.bincount(codes, weights=centered[:, j] * dy, minlength=n_groups)
+            / np.sqrt(np.bincount(codes, weights=centered[:, j] ** 2, minlength=n_groups) * syy)
+            for j in (1, 2)])
+    return counts, r
+
+
+def _channel_pearson_loops(codes, values, n_groups):
+    """Same as _channel_pearson_numpy, as one pass for the means and one for the moments"""
+    n = codes.shape[0]
+    counts = np.zeros(n_groups, dtype=np.int64)
+    means = np.zeros((n_groups, 3))
+    for i in range(n):
+        g = codes[i]
+        counts[g] += 1
+        for j in range(3):
+            means[g, j] += values[i, j]
+    for g in range(n_groups):
+        for j in range(3):
+            means[g, j] /= counts[g]
+    
+    # syy, s11, s22, s1y, s2y per group
+    moments = np.zeros((n_groups, 5))
+    for i in range(n):
+        g = codes[i]
+        dy = values[i, 0] - means[g, 0]
+        d1 = values[i, 1] - means[g, 1]
+        d2 = values[i, 2] - means[g, 2]
+        moments[g, 0] += dy * dy
+        moments[g, 1] += d1 * d1
+        moments[g, 2] += d2 * d2
+        moments[g, 3] += d1 * dy
+        moments[g, 4] += d2 * dy
+    
+    r = np.empty((n_groups, 2))
+    for g in range(n_groups):
+        r[g, 0] = moments[g, 3] / np.sqrt(moments[g, 1] * moments[g, 0])
+        r[g, 1] = moments[g, 4] / np.sqrt(moments[g, 2] * moments[g, 0])
+    return counts, r
+
+
+# Every channel's temperature and rainfall correlations come out of the same
+# two passes over the rows. fastmath is left off so constant columns still
+# give NaN rather than garbage.
+if njit is not None:
+    _channel_pearson_kernel = njit(cache=True, error_model='numpy')(_channel_pearson_loops)
+else:
+    _channel_pearson_kernel = _channel_pearson_numpy
+
 
 class WeatherAnalyzer:
     """
@@ -10,25 +124,50 @@ class WeatherAnalyzer:
     Generates weather-driven insights and recommendations
     """
     
-    def __init__(self, combined_df: pd.DataFrame):
+    def __init__(self, combined_df: pd.DataFrame, copy: bool = False):
         """
         Initialize with combined dataframe
         combined_df should have columns: date, conversions, revenue, visits, 
                     temperature_c, rainfall_mm, channel, city
+        copy: take a private copy of combined_df; the analyzer only reads its
+              columns, so by default the caller's frame is shared. Never
+              copied without weather data, as nothing is analyzed then
         """
-        self.df = combined_df.copy()
+        self._has_weather = all(col in combined_df.columns for col in WEATHER_COLS)
+        self.df = combined_df.copy() if copy and self._has_weather else combined_df
         self.correlations = {}
         self.insights = []
         self.recommendations = []
-        
-        # Ensure date is datetime
-        if 'date' in self.df.columns:
-            self.df['date'] = pd.to_datetime(self.df['date'])
+        # Memoized strong-correlation/rainy/temperature/by-channel results,
+        # shared by insights, recommendations and the summary; reset whenever
+        # the correlations are recomputed
+        self._cache = {}
+        
+        # Ensure date is datetime; assign returns a new frame, so the
+        # caller's frame is left untouched. Skipped without weather data,
+        # where analyze_all returns straight away
+        if self._has_weather and 'date' in self.df.columns and not is_datetime64_any_dtype(self.df['date']):
+            self.df = self.df.assign(date=pd.to_datetime(self.df['date']))
+        
+        # Channel as category (the pipeline already casts it) so channel
+        # grouping works on small integer codes instead of strings
+        if (self._has_weather and 'channel' in self.df.columns
+                and not isinstance(self.df['channel'].dtype, pd.CategoricalDtype)):
+            self.df = self.df.assign(channel=self.df['channel'].astype('category'))
+        
+        # Hot columns extracted once as float64 arrays (missing values as NaN)
+        # so the analyses skip pandas dispatch on every reduction. Skipped
+        # when there is no weather column at all, since every analysis
+        # needs at least one (the rainy-day and temperature ones need only
+        # their own)
+        self._arr = {}
+        if any(col in self.df.columns for col in WEATHER_COLS):
+            self._arr = {col: self.df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                         for col in ARRAY_COLS if col in self.df.columns}
     
     def check_weather_data_available(self) -> bool:
         """Check if weather data exists in dataframe"""
-        weather_cols = ['temperature_c', 'rainfall_mm']
-        return all(col in self.df.columns for col in weather_cols)
+        return self._has_weather
     
     def calculate_correlations(self) -> Dict[str, Dict]:
         """
@@ -39,30 +178,43 @@ class WeatherAnalyzer:
             print("⚠️ Weather data not available")
             return {}
         
-        weather_cols = ['temperature_c', 'rainfall_mm']
+        weather_cols = WEATHER_COLS
         performance_cols = ['conversions', 'revenue', 'visits', 'clicks', 'impressions']
         
         # Filter only available performance columns
         available_perf_cols = [col for col in performance_cols if col in self.df.columns]
         
+        # NaN masks computed once per column; each pair's complete rows are
+        # the AND of two masks over the cached arrays, like a per-pair dropna()
+        valid = {col: ~np.isnan(self._arr[col]) for col in available_perf_cols + weather_cols}
+        r = np.full((len(available_perf_cols), len(weather_cols)), np.nan)
+        n = np.zeros(r.shape, dtype=np.int64)
+        
+        for i, perf_col in enumerate(available_perf_cols):
+            for j, weather_col in enumerate(weather_cols):
+                mask = valid[perf_col] & valid[weather_col]
+                n[i, j] = np.count_nonzero(mask)
+                if n[i, j] > 2:
+                    r[i, j] = _pearson(self._arr[weather_col][mask], self._arr[perf_col][mask])
+        
+        r = np.clip(r, -1.0, 1.0)
+        p_values = _pearson_p_values(r, n)
+        
         correlations = {}
         
-        for perf_col in available_perf_cols:
+        for i, perf_col in enumerate(available_perf_cols):
             correlations[perf_col] = {}
             
-            for weather_col in weather_cols:
-                # Remove NaN values for correlation
-                valid_data = self.df[[perf_col, weather_col]].dropna()
-                
-                if len(valid_data) > 2:  # Need at least 3 data points
-                    corr, p_value = stats.pearsonr(valid_data[weather_col], valid_data[perf_col])
+            for j, weather_col in enumerate(weather_cols):
+                if n[i, j] > 2:  # Need at least 3 data points
                     correlations[perf_col][weather_col] = {
-                        'correlation': corr,
-                        'p_value': p_value,
-                        'significant': p_value < 0.05  # 95% confidence
+                        'correlation': r[i, j],
+                        'p_value': p_values[i, j],
+                        'significant': p_values[i, j] < 0.05  # 95% confidence
                     }
         
         self.correlations = correlations
+        self._cache.clear()
         return correlations
     
     def get_strong_correlations(self, threshold: float = 0.6) -> Dict[str, Dict]:
@@ -70,6 +222,10 @@ class WeatherAnalyzer:
         Get correlations above threshold (strong signals)
         threshold: typically 0.6 for strong correlation
         """
+        key = ('strong', threshold)
+        if key in self._cache:
+            return self._cache[key]
+        
         strong = {}
         
         for metric, weather_corr in self.correlations.items():
@@ -80,6 +236,7 @@ class WeatherAnalyzer:
                         strong[metric] = {}
                     strong[metric][weather_type] = data
         
+        self._cache[key] = strong
         return strong
     
     def analyze_rainy_days(self) -> Dict:
@@ -88,25 +245,33 @@ class WeatherAnalyzer:
         """
         if 'rainfall_mm' not in self.df.columns:
             return {}
+        if 'rainy' in self._cache:
+            return self._cache['rainy']
         
         # Define rainy day: rainfall > 1mm
         rainy_threshold = 1.0
-        rainy_days = self.df[self.df['rainfall_mm'] > rainy_threshold]
-        non_rainy_days = self.df[self.df['rainfall_mm'] <= rainy_threshold]
+        rainfall = self._arr['rainfall_mm']
         
         metrics_to_analyze = ['conversions', 'revenue', 'visits', 'clicks']
         available_metrics = [m for m in metrics_to_analyze if m in self.df.columns]
         
+        # NaN rainfall compares False both ways, so unknown days fall in neither group
+        rainy_mask = rainfall > rainy_threshold
+        non_rainy_mask = rainfall <= rainy_threshold
+        rainy_count = int(np.count_nonzero(rainy_mask))
+        non_rainy_count = int(np.count_nonzero(non_rainy_mask))
+        
         analysis = {
-            'rainy_days_count': len(rainy_days),
-            'non_rainy_days_count': len(non_rainy_days),
+            'rainy_days_count': rainy_count,
+            'non_rainy_days_count': non_rainy_count,
             'metrics': {}
         }
         
         for metric in available_metrics:
-            if len(rainy_days) > 0 and len(non_rainy_days) > 0:
-                rainy_avg = rainy_days[metric].mean()
-                non_rainy_avg = non_rainy_days[metric].mean()
+            if rainy_count > 0 and non_rainy_count > 0:
+                values = self._arr[metric]
+                rainy_avg = _nanmean(values[rainy_mask])
+                non_rainy_avg = _nanmean(values[non_rainy_mask])
                 
                 # Calculate percentage difference
                 if non_rainy_avg > 0:
@@ -121,6 +286,7 @@ class WeatherAnalyzer:
                     'interpretation': 'increase' if pct_change > 0 else 'decrease'
                 }
         
+        self._cache['rainy'] = analysis
         return analysis
     
     def analyze_temperature_ranges(self) -> Dict:
@@ -130,168 +296,190 @@ class WeatherAnalyzer:
         """
         if 'temperature_c' not in self.df.columns:
             return {}
-        
-        # Define temperature ranges
-        temp_ranges = {
-            'cold': (0, 10),
-            'cool': (10, 15),
-            'mild': (15, 20),
-            'warm': (20, 25),
-            'hot': (25, 50)
-        }
+        if 'temperature' in self._cache:
+            return self._cache['temperature']
         
         metrics_to_analyze = ['conversions', 'revenue', 'visits', 'clicks']
         available_metrics = [m for m in metrics_to_analyze if m in self.df.columns]
         
-        analysis = {}
+        # One sorted lookup gives every row its range index; below 0°C,
+        # from 50°C up and NaN fall outside [0, n_ranges) and are dropped
+        n_ranges = len(TEMP_LABELS)
+        range_idx = np.searchsorted(TEMP_BINS, self._arr['temperature_c'], side='right') - 1
+        in_range = (range_idx >= 0) & (range_idx < n_ranges)
+        range_idx = range_idx[in_range]
+        range_counts = np.bincount(range_idx, minlength=n_ranges)
         
-        for temp_name, (min_t, max_t) in temp_ranges.items():
-            temp_data = self.df[(self.df['temperature_c'] >= min_t) & (self.df['temperature_c'] < max_t)]
+        # Per-range avg/total/max/min of each metric, skipping NaN like pandas
+        range_stats = {}
+        for metric in available_metrics:
+            values = self._arr[metric][in_range]
+            present = ~np.isnan(values)
+            totals = np.bincount(range_idx, weights=np.where(present, values, 0.0), minlength=n_ranges)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                avgs = totals / np.bincount(range_idx, weights=present, minlength=n_ranges)
+            maxs = np.full(n_ranges, np.nan)
+            np.fmax.at(maxs, range_idx, values)
+            mins = np.full(n_ranges, np.nan)
+            np.fmin.at(mins, range_idx, values)
             
-            if len(temp_data) > 0:
+            # Integer columns keep integer totals and extremes
+            if self.df[metric].dtype.kind in 'iu':
+                totals, maxs, mins = (np.where(range_counts > 0, col, 0).astype(np.int64)
+                                      for col in (totals, maxs, mins))
+            range_stats[metric] = (avgs, totals, maxs, mins)
+        
+        analysis = {}
+        
+        for i, temp_name in enumerate(TEMP_LABELS):
+            if range_counts[i] > 0:
                 range_analysis = {
-                    'count': len(temp_data),
+                    'count': int(range_counts[i]),
                     'metrics': {}
                 }
                 
-                for metric in available_metrics:
+                for metric, (avgs, totals, maxs, mins) in range_stats.items():
                     range_analysis['metrics'][metric] = {
-                        'avg': temp_data[metric].mean(),
-                        'total': temp_data[metric].sum(),
-                        'max': temp_data[metric].max(),
-                        'min': temp_data[metric].min()
+                        'avg': avgs[i],
+                        'total': totals[i],
+                        'max': maxs[i],
+                        'min': mins[i]
                     }
                 
                 analysis[temp_name] = range_analysis
         
+        self._cache['temperature'] = analysis
         return analysis
     
-    def generate_weather_insights(self) -> List[Dict]:
+    @staticmethod
+    def _temperature_extremes(temp_analysis: Dict) -> Tuple[str, str]:
         """
-        Generate human-readable insights from weather analysis
+        Names of the ranges with the highest and lowest average conversions
+        Ranges without any conversions data (NaN average) are never picked
+        unless every range is NaN; ties go to the earlier range
+        """
+        names = [name for name in TEMP_LABELS if name in temp_analysis]
+        avgs = np.array([temp_analysis[name]['metrics'].get('conversions', {}).get('avg', 0)
+                         for name in names], dtype=np.float64)
+        missing = np.isnan(avgs)
+        if missing.all():
+            return names[0], names[0]
+        best = np.where(missing, -np.inf, avgs).argmax()
+        worst = np.where(missing, np.inf, avgs).argmin()
+        return names[int(best)], names[int(worst)]
+    
+    def _build_insights_and_recommendations(self, strong_corr: Dict, rainy_analysis: Dict,
+                                            temp_analysis: Dict) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Build the insights and recommendations lists in one walk over the
+        strong correlations, rainy-day and temperature-range analyses
         """
         insights = []
+        recommendations = []
         
-        # Get strong correlations
-        strong_corr = self.get_strong_correlations(threshold=0.6)
-        
+        # Strong correlations
         for metric, weather_data in strong_corr.items():
             for weather_type, corr_data in weather_data.items():
                 corr_value = corr_data['correlation']
                 direction = 'increases' if corr_value > 0 else 'decreases'
                 
-                insight = {
+                insights.append({
                     'type': 'correlation',
                     'metric': metric,
                     'weather_factor': weather_type,
                     'correlation': corr_value,
                     'strength': 'strong' if abs(corr_value) > 0.7 else 'moderate',
                     'text': f"Performance correlates with {weather_type}: {metric} {direction} when {weather_type} increases (r={corr_value:.2f})"
-                }
-                insights.append(insight)
-        
-        # Rainy day insights
-        rainy_analysis = self.analyze_rainy_days()
+                })
+                
+                if corr_value > 0.6:
+                    # Positive correlation: increase investment when weather is favorable
+                    recommendations.append({
+                        'type': 'increase_budget_when_favorable',
+                        'priority': 'high',
+                        'text': f"Increase marketing budget when {weather_type} is favorable (high), as it correlates with higher {metric}",
+                        'estimated_impact': f"{abs(corr_value) * 100:.0f}% correlation"
+                    })
+                elif corr_value < -0.6:
+                    # Negative correlation: shift budget to digital when unfavorable weather
+                    recommendations.append({
+                        'type': 'shift_to_digital_when_unfavorable',
+                        'priority': 'high',
+                        'text': f"When {weather_type} is unfavorable, shift budget toward digital channels as {metric} drops",
+                        'estimated_impact': f"{abs(corr_value) * 100:.0f}% correlation"
+                    })
+        
+        # Rainy days
         if rainy_analysis:
             for metric, data in rainy_analysis.get('metrics', {}).items():
                 pct = data['pct_change']
                 if abs(pct) > 10:  # Only significant changes
-                    insight = {
+                    insights.append({
                         'type': 'rainy_day',
                         'metric': metric,
                         'pct_change': pct,
                         'text': f"On rainy days, {metric} {data['interpretation']} by {abs(pct):.1f}%"
-                    }
-                    insights.append(insight)
-        
-        # Temperature range insights
-        temp_analysis = self.analyze_temperature_ranges()
-        if temp_analysis:
-            # Find best and worst performing temperature ranges
-            best_temp = max(temp_analysis.items(), 
-                           key=lambda x: x[1]['metrics'].get('conversions', {}).get('avg', 0))
-            worst_temp = min(temp_analysis.items(),
-                            key=lambda x: x[1]['metrics'].get('conversions', {}).get('avg', 0))
+                    })
             
-            if best_temp[0] != worst_temp[0]:
-                insight = {
-                    'type': 'temperature_range',
-                    'best_temp': best_temp[0],
-                    'worst_temp': worst_temp[0],
-                    'text': f"Performance peaks during {best_temp[0]} weather and dips during {worst_temp[0]} weather"
-                }
-                insights.append(insight)
-        
-        self.insights = insights
-        return insights
-    
-    def generate_recommendations(self) -> List[Dict]:
-        """
-        Generate actionable recommendations based on weather insights
-        """
-        recommendations = []
-        
-        # If strong weather correlation detected
-        strong_corr = self.get_strong_correlations(threshold=0.6)
-        
-        if strong_corr:
-            for metric, weather_data in strong_corr.items():
-                for weather_type, data in weather_data.items():
-                    if data['correlation'] > 0.6:
-                        # Positive correlation: increase investment when weather is favorable
-                        rec = {
-                            'type': 'increase_budget_when_favorable',
-                            'priority': 'high',
-                            'text': f"Increase marketing budget when {weather_type} is favorable (high), as it correlates with higher {metric}",
-                            'estimated_impact': f"{abs(data['correlation']) * 100:.0f}% correlation"
-                        }
-                        recommendations.append(rec)
-                    elif data['correlation'] < -0.6:
-                        # Negative correlation: shift budget to digital when unfavorable weather
-                        rec = {
-                            'type': 'shift_to_digital_when_unfavorable',
-                            'priority': 'high',
-                            'text': f"When {weather_type} is unfavorable, shift budget toward digital channels as {metric} drops",
-                            'estimated_impact': f"{abs(data['correlation']) * 100:.0f}% correlation"
-                        }
-                        recommendations.append(rec)
-        
-        # Rainy day specific recommendations
-        rainy_analysis = self.analyze_rainy_days()
-        if rainy_analysis:
             rainy_conv = rainy_analysis['metrics'].get('conversions', {})
             if rainy_conv.get('pct_change', 0) > 10:
-                rec = {
+                recommendations.append({
                     'type': 'capitalize_on_rainy_days',
                     'priority': 'high',
                     'text': f"Conversions increase {rainy_conv['pct_change']:.1f}% on rainy days. Increase digital ad spend when rain is forecasted.",
                     'estimated_impact': f"+{rainy_conv['pct_change']:.1f}% conversions"
-                }
-                recommendations.append(rec)
+                })
             elif rainy_conv.get('pct_change', 0) < -10:
-                rec = {
+                recommendations.append({
                     'type': 'reduce_spend_on_rainy_days',
                     'priority': 'medium',
                     'text': f"Conversions drop {abs(rainy_conv['pct_change']):.1f}% on rainy days. Consider reducing outdoor/foot-traffic focused campaigns.",
                     'estimated_impact': f"Save {abs(rainy_conv['pct_change']):.1f}% wasted spend"
-                }
-                recommendations.append(rec)
-        
-        # Temperature range recommendations
-        temp_analysis = self.analyze_temperature_ranges()
-        if len(temp_analysis) > 1:
-            best_temp = max(temp_analysis.items(),
-                           key=lambda x: x[1]['metrics'].get('conversions', {}).get('avg', 0))
-            rec = {
-                'type': 'optimize_for_best_temperature',
-                'priority': 'medium',
-                'text': f"Performance peaks during {best_temp[0]} weather. Plan major campaigns and promotions for these conditions.",
-                'estimated_impact': "Maximize campaign ROI"
-            }
-            recommendations.append(rec)
-        
-        self.recommendations = recommendations
-        return recommendations
+                })
+        
+        # Temperature ranges: best and worst performing
+        if temp_analysis:
+            best_temp, worst_temp = self._temperature_extremes(temp_analysis)
+            
+            if best_temp != worst_temp:
+                insights.append({
+                    'type': 'temperature_range',
+                    'best_temp': best_temp,
+                    'worst_temp': worst_temp,
+                    'text': f"Performance peaks during {best_temp} weather and dips during {worst_temp} weather"
+                })
+            
+            if len(temp_analysis) > 1:
+                recommendations.append({
+                    'type': 'optimize_for_best_temperature',
+                    'priority': 'medium',
+                    'text': f"Performance peaks during {best_temp} weather. Plan major campaigns and promotions for these conditions.",
+                    'estimated_impact': "Maximize campaign ROI"
+                })
+        
+        return insights, recommendations
+    
+    def _insights_and_recommendations(self) -> Tuple[List[Dict], List[Dict]]:
+        """Run the three source analyses once and build both lists from them"""
+        return self._build_insights_and_recommendations(
+            self.get_strong_correlations(threshold=0.6),
+            self.analyze_rainy_days(),
+            self.analyze_temperature_ranges()
+        )
+    
+    def generate_weather_insights(self) -> List[Dict]:
+        """
+        Generate human-readable insights from weather analysis
+        """
+        self.insights, _ = self._insights_and_recommendations()
+        return self.insights
+    
+    def generate_recommendations(self) -> List[Dict]:
+        """
+        Generate actionable recommendations based on weather insights
+        """
+        _, self.recommendations = self._insights_and_recommendations()
+        return self.recommendations
     
     def get_by_channel_weather_impact(self) -> Dict:
         """
@@ -299,18 +487,26 @@ class WeatherAnalyzer:
         """
         if 'channel' not in self.df.columns or not self.check_weather_data_available():
             return {}
+        if 'by_channel' in self._cache:
+            return self._cache['by_channel']
         
         by_channel = {}
         
-        for channel in self.df['channel'].unique():
-            channel_df = self.df[self.df['channel'] == channel]
-            
-            # Calculate correlation for this channel
-            valid_data = channel_df[['conversions', 'temperature_c', 'rainfall_mm']].dropna()
-            
-            if len(valid_data) > 2:
-                temp_corr, temp_p = stats.pearsonr(valid_data['temperature_c'], valid_data['conversions'])
-                rain_corr, rain_p = stats.pearsonr(valid_data['rainfall_mm'], valid_data['conversions'])
+        # Codes follow first appearance like unique(); missing channels get -1
+        codes, channels = pd.factorize(self.df['channel'])
+        values = np.column_stack([self._arr[col] for col in ('conversions', 'temperature_c', 'rainfall_mm')])
+        valid = ~np.isnan(values).any(axis=1) & (codes >= 0)
+        
+        # Correlations for all channels at once from per-channel sums of
+        # centered products, instead of a pass over each channel's rows
+        counts, r = _channel_pearson_kernel(codes[valid], values[valid], len(channels))
+        r = np.clip(r, -1.0, 1.0)
+        p_values = _pearson_p_values(r, counts[:, None])
+        
+        for code, channel in enumerate(channels):
+            if counts[code] > 2:
+                temp_corr, rain_corr = r[code]
+                temp_p, rain_p = p_values[code]
                 
                 by_channel[channel] = {
                     'temperature_correlation': {
@@ -325,6 +521,7 @@ class WeatherAnalyzer:
                     }
                 }
         
+        self._cache['by_channel'] = by_channel
         return by_channel
     
     def generate_summary(self) -> Dict:
@@ -357,10 +554,10 @@ class WeatherAnalyzer:
         self.calculate_correlations()
         print("✓ Correlations calculated")
         
-        self.generate_weather_insights()
+        # Insights and recommendations come from the same analyses, so both
+        # lists are built in one pass
+        self.insights, self.recommendations = self._insights_and_recommendations()
         print("✓ Insights generated")
-        
-        self.generate_recommendations()
         print("✓ Recommendations generated")
         
         summary = self.generate_summary()